@@ -0,0 +1,85 @@
+from typing import Any, Callable, Dict
+from .services.llm import LLMService
+from .services.sendgrid import EmailService
+from .services.graph import EmailAgentGraph
+from .services.tool import create_agent_tools
+from .services.transport import close_shared_transports
+from .services.state import StateStore, create_state_store
+from .services.history import EmailHistory
+from .services.cache import DraftCache
+from .services.coalesce import SingleFlight
+from .services.metrics import LLMMetrics
+from .services.parsing import ParseStats
+from .services.tracing import Tracer
+from .interactors.email import EmailInteractor
+
+class ServiceContainer:
+    def __init__(self):
+        self.instances: Dict[str, Any] = {}
+        self.started = False
+
+    def get(self, name: str, factory: Callable[[], Any]) -> Any:
+        if name not in self.instances:
+            self.instances[name] = factory()
+        return self.instances[name]
+
+    @property
+    def tracer(self) -> Tracer:
+        return self.get("tracer", Tracer)
+
+    @property
+    def draft_cache(self) -> DraftCache:
+        return self.get("draft_cache", DraftCache)
+
+    @property
+    def single_flight(self) -> SingleFlight:
+        return self.get("single_flight", SingleFlight)
+
+    @property
+    def llm_metrics(self) -> LLMMetrics:
+        return self.get("llm_metrics", LLMMetrics)
+
+    @property
+    def parse_stats(self) -> ParseStats:
+        return self.get("parse_stats", ParseStats)
+
+    @property
+    def llm_service(self) -> LLMService:
+        return self.get("llm_service", lambda: LLMService(self.draft_cache, self.single_flight, self.llm_metrics, tracer=self.tracer, parse_stats=self.parse_stats))
+
+    @property
+    def email_service(self) -> EmailService:
+        return self.get("email_service", lambda: EmailService(tracer=self.tracer))
+
+    @property
+    def agent_graph(self) -> EmailAgentGraph:
+        return self.get("agent_graph", lambda: EmailAgentGraph(self.llm_service, create_agent_tools(self.llm_service, self.email_service, tracer=self.tracer), tracer=self.tracer))
+
+    @property
+    def state_store(self) -> StateStore:
+        return self.get("state_store", create_state_store)
+
+    @property
+    def email_history(self) -> EmailHistory:
+        return self.get("email_history", EmailHistory)
+
+    @property
+    def email_interactor(self) -> EmailInteractor:
+        return self.get("email_interactor", lambda: EmailInteractor(self.agent_graph, self.email_service, self.state_store, self.email_history, self.tracer))
+
+    async def startup(self) -> None:
+        await self.email_interactor.send_queue.start()
+        self.started = True
+
+    async def shutdown(self) -> None:
+        interactor = self.instances.get("email_interactor")
+        if interactor is not None and self.started:
+            await interactor.send_queue.stop()
+        self.started = False
+
+        for name in ("agent_graph", "llm_service", "email_service", "state_store", "email_history", "draft_cache", "tracer"):
+            instance = self.instances.get(name)
+            if instance is not None:
+                await instance.aclose()
+        self.instances.clear()
+        await close_shared_transports()
@@ -1,25 +1,53 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, AsyncIterator, Tuple
 from datetime import datetime
-from ..schemas.email import RecentEmail, EmailSendRequest, EmailSendResult
+import time
+import json
+from ..schemas.email import RecentEmail, EmailSendRequest, EmailSendJob, DraftBatchRequest
 from ..services.graph import EmailAgentGraph
-from ..services.sendgrid import EmailService
+from ..services.llm import LLMService
+from ..services.tool import create_agent_tools
+from ..services.intent import intent_router, draft_topic, HELP_TEXT
+from ..services.sendgrid import EmailService, normalize_recipients
+from ..services.queue import SendQueue
+from ..services.idempotency import IdempotencyCache, fingerprint
+from ..services.tracing import Tracer, get_shared_tracer
+from ..services.state import StateStore, create_state_store
+from ..services.history import EmailHistory
+
+def chat_succeeded(result: Dict[str, Any]) -> bool:
+    return bool(result.get("success"))
 
 class EmailInteractor:
-    def __init__(self):
-        self.agent_graph = EmailAgentGraph()
-        self.email_service = EmailService()
-        self.recent_emails = []  
+    def __init__(self, agent_graph: EmailAgentGraph = None, email_service: EmailService = None, state_store: StateStore = None, history: EmailHistory = None, tracer: Tracer = None):
+        self.tracer = tracer or get_shared_tracer()
+        self.email_service = email_service or EmailService(tracer=self.tracer)
+        self.state_store = state_store or create_state_store()
+        if agent_graph is None:
+            llm_service = LLMService(tracer=self.tracer)
+            agent_graph = EmailAgentGraph(llm_service, create_agent_tools(llm_service, self.email_service, tracer=self.tracer), tracer=self.tracer)
+        self.agent_graph = agent_graph
+        self.send_queue = SendQueue(self.email_service, on_complete=self.record_send_job, tracer=self.tracer)
+        self.idempotency = IdempotencyCache(store=self.state_store)
+        self.history = history or EmailHistory()
         
-    async def process_chat_message(self, message: str, employee_emails: List[str] = None) -> Dict[str, Any]:
+    async def process_chat_message(self, message: str, employee_emails: List[str] = None, idempotency_key: Optional[str] = None, thread_id: Optional[str] = None) -> Dict[str, Any]:
+        with self.tracer.span("chat.message", threaded=thread_id is not None):
+            if idempotency_key:
+                return await self.idempotency.run(
+                    ("chat", idempotency_key),
+                    fingerprint(message, employee_emails, thread_id),
+                    lambda: self.handle_chat_message(message, employee_emails, thread_id),
+                    cache_if=chat_succeeded
+                )
+            return await self.handle_chat_message(message, employee_emails, thread_id)
+    
+    async def handle_chat_message(self, message: str, employee_emails: List[str] = None, thread_id: Optional[str] = None) -> Dict[str, Any]:
         try:
-            if employee_emails is None:
-                employee_emails = []
+            employee_emails = normalize_recipients(employee_emails or [])
             
-            message_lower = message.lower()
+            intent = intent_router.route(message).intent
             
-            needs_sending = any(phrase in message_lower for phrase in ["send email", "send it", "send the email"])
-            
-            if needs_sending and not employee_emails:
+            if intent == "send" and not employee_emails:
                 return {
                     "success": False,
                     "response": "❌ No email addresses available! Please add Gmail accounts or other email addresses in the sidebar first to send emails.",
@@ -27,16 +55,31 @@ class EmailInteractor:
                     "pending_send": False
                 }
             
-            agent_result = await self.agent_graph.process_message(message, employee_emails)
+            if intent == "help":
+                return {
+                    "success": True,
+                    "response": HELP_TEXT,
+                    "email_draft": "",
+                    "pending_send": False,
+                    "email_sent": False
+                }
+            
+            if intent in ("send", "regenerate") and thread_id:
+                await self.load_pending_email(thread_id)
+            
+            agent_result = await self.agent_graph.process_message(message, employee_emails, thread_id)
             
             response = agent_result.get("response", "I'm here to help you with email communications!")
             email_draft = agent_result.get("email_draft", "")
             send_result = agent_result.get("send_result")
             pending_email = agent_result.get("pending_email", {})
             
+            if thread_id and (email_draft or (send_result and send_result.get("success"))):
+                await self.save_pending_email(thread_id, {} if send_result else pending_email)
+            
             if send_result:
                 if send_result.get("success"):
-                    recipient_info = self._get_recipient_info(employee_emails)
+                    recipient_info = self.get_recipient_info(employee_emails)
                     response = f"✅ **Email Sent Successfully by AI Agent!**\n\n📧 **Subject:** {pending_email.get('subject', 'Email')}\n📬 **Recipients:** {send_result['sent_count']} out of {send_result['total_count']} recipients\n📋 **Breakdown:** {', '.join(recipient_info)}\n\n🎉 Your email has been delivered to all recipients!"
                     
                     recent_email = RecentEmail(
@@ -47,7 +90,7 @@ class EmailInteractor:
                         success_count=send_result["sent_count"],
                         total_count=send_result["total_count"]
                     )
-                    self.recent_emails.append(recent_email)
+                    await self.record_recent_email(recent_email)
                     
                     return {
                         "success": True,
@@ -72,21 +115,7 @@ class EmailInteractor:
                     }
             
             elif email_draft:
-                if employee_emails:
-                    recipient_info = self._get_recipient_info(employee_emails)
-                    response = f"📝 **Email Generated by AI Agent!**\n\nI've created a professional email for {len(employee_emails)} recipients:\n📋 **Recipients:** {', '.join(recipient_info)}\n\n**Should I send this email or would you like to enhance it?**\n\n💡 *Say 'send it' to send immediately, or 'enhance it' to make improvements.*"
-                    pending_send = True
-                else:
-                    response = f"📝 **Email Generated by AI Agent!**\n\nI've created a professional email for you to review.\n\n**To send this email:**\n1. Add recipient email addresses in the sidebar\n2. Then say 'send it' to deliver the email\n\n💡 *You can also ask me to 'enhance it' or make modifications.*"
-                    pending_send = False
-                
-                return {
-                    "success": True,
-                    "response": response,
-                    "email_draft": email_draft,
-                    "pending_send": pending_send,
-                    "email_sent": False
-                }
+                return self.build_draft_response(email_draft, employee_emails)
             
             else:
                 return {
@@ -107,6 +136,85 @@ class EmailInteractor:
                 "email_sent": False
             }
     
+    async def stream_chat_message(self, message: str, employee_emails: List[str] = None, idempotency_key: Optional[str] = None, thread_id: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        employee_emails = normalize_recipients(employee_emails or [])
+        
+        key = ("chat", idempotency_key) if idempotency_key else None
+        if key:
+            existing = await self.idempotency.claim(key, fingerprint(message, employee_emails, thread_id))
+            if existing is not None:
+                yield {"event": "result", **(await existing)}
+                return
+        
+        with self.tracer.detached_span("chat.message.stream", threaded=thread_id is not None) as span:
+            result = None
+            try:
+                route = intent_router.route(message)
+                span.set(intent=route.intent)
+                topic = route.topic
+                if route.intent == "regenerate":
+                    topic = draft_topic(await self.load_pending_email(thread_id)) if thread_id else ""
+            
+                if route.intent in ("generate", "regenerate") and topic:
+                    yield {"event": "status", "response": "I'll help you generate a professional email. Let me create that for you."}
+                    email_draft = ""
+                    async for event in self.tracer.iterate(span, self.agent_graph.llm_service.stream_email(
+                        topic,
+                        "",
+                        bypass_cache=route.regenerate
+                    )):
+                        if event["event"] == "draft":
+                            email_draft = event["email_draft"]
+                        else:
+                            yield event
+                    if thread_id:
+                        pending_email = {**json.loads(email_draft), "topic": topic}
+                        await self.agent_graph.set_pending_email(thread_id, pending_email)
+                        await self.save_pending_email(thread_id, pending_email)
+                    result = self.build_draft_response(email_draft, employee_emails)
+                else:
+                    with self.tracer.activate(span):
+                        result = await self.handle_chat_message(message, employee_emails, thread_id)
+            except Exception as e:
+                result = {
+                    "success": False,
+                    "error": f"Failed to process message: {str(e)}",
+                    "response": "I apologize, but I encountered an error processing your request.",
+                    "email_draft": "",
+                    "pending_send": False,
+                    "email_sent": False
+                }
+            finally:
+                if key:
+                    await self.idempotency.resolve(key, result, None if result is not None else RuntimeError("Stream was interrupted"), cache_if=chat_succeeded)
+        
+        yield {"event": "result", **result}
+    
+    def build_draft_response(self, email_draft: str, employee_emails: List[str]) -> Dict[str, Any]:
+        if employee_emails:
+            self.speculate_send(email_draft, employee_emails)
+            recipient_info = self.get_recipient_info(employee_emails)
+            response = f"📝 **Email Generated by AI Agent!**\n\nI've created a professional email for {len(employee_emails)} recipients:\n📋 **Recipients:** {', '.join(recipient_info)}\n\n**Should I send this email or would you like to enhance it?**\n\n💡 *Say 'send it' to send immediately, or 'enhance it' to make improvements.*"
+            pending_send = True
+        else:
+            response = f"📝 **Email Generated by AI Agent!**\n\nI've created a professional email for you to review.\n\n**To send this email:**\n1. Add recipient email addresses in the sidebar\n2. Then say 'send it' to deliver the email\n\n💡 *You can also ask me to 'enhance it' or make modifications.*"
+            pending_send = False
+        
+        return {
+            "success": True,
+            "response": response,
+            "email_draft": email_draft,
+            "pending_send": pending_send,
+            "email_sent": False
+        }
+    
+    def speculate_send(self, email_draft: str, employee_emails: List[str]) -> None:
+        try:
+            email = json.loads(email_draft)
+            self.email_service.speculate(employee_emails, email["subject"], email["body"])
+        except Exception:
+            self.email_service.record_speculation_failure()
+    
     def get_recipient_info(self, target_emails: List[str]) -> List[str]:
         gmail_count = sum(1 for email in target_emails if email.lower().endswith('@gmail.com'))
         other_count = len(target_emails) - gmail_count
@@ -119,45 +227,129 @@ class EmailInteractor:
         
         return recipient_info
     
-    def get_recent_emails(self, limit: int = 10) -> List[RecentEmail]:
-        return self.recent_emails[-limit:] if self.recent_emails else []
+    async def load_pending_email(self, thread_id: str) -> Dict[str, str]:
+        stored = await self.state_store.get(f"pending_email:{thread_id}")
+        pending_email = json.loads(stored) if stored else {}
+        if pending_email != await self.agent_graph.get_pending_email(thread_id):
+            await self.agent_graph.set_pending_email(thread_id, pending_email)
+        return pending_email
+    
+    async def save_pending_email(self, thread_id: str, pending_email: Dict[str, str]) -> None:
+        key = f"pending_email:{thread_id}"
+        if pending_email:
+            await self.state_store.set(key, json.dumps(pending_email), self.agent_graph.idle_ttl_seconds)
+        else:
+            await self.state_store.delete(key)
+    
+    async def record_recent_email(self, recent_email: RecentEmail) -> None:
+        await self.history.record(recent_email.model_dump())
+    
+    async def get_recent_emails(self, limit: int = 10, cursor: Optional[str] = None, since: Optional[datetime] = None, until: Optional[datetime] = None, recipient: Optional[str] = None) -> Tuple[List[RecentEmail], Optional[str]]:
+        emails, next_cursor = await self.history.query(limit, cursor, since, until, recipient)
+        return [RecentEmail(**email) for email in emails], next_cursor
+    
+    async def enqueue_send(self, send_request: EmailSendRequest, idempotency_key: Optional[str] = None) -> EmailSendJob:
+        if idempotency_key:
+            job = await self.idempotency.run(
+                ("send", idempotency_key),
+                fingerprint(send_request.subject, send_request.body, send_request.employee_emails),
+                lambda: self.send_queue.enqueue(send_request.employee_emails, send_request.subject, send_request.body)
+            )
+            return await self.get_send_job(job["job_id"]) or EmailSendJob(**job)
+        
+        job = await self.send_queue.enqueue(
+            send_request.employee_emails,
+            send_request.subject,
+            send_request.body
+        )
+        return EmailSendJob(**job)
+    
+    async def get_send_job(self, job_id: str) -> Optional[EmailSendJob]:
+        job = await self.send_queue.get_job(job_id)
+        return EmailSendJob(**job) if job else None
+    
+    async def record_send_job(self, job: Dict[str, Any]) -> None:
+        if job["sent_count"] == 0:
+            return
+        
+        recipients = await self.send_queue.get_recipients(job["job_id"])
+        recent_email = RecentEmail(
+            subject=job["subject"],
+            body=job["body"],
+            recipients=recipients,
+            sent_at=datetime.now(),
+            success_count=job["sent_count"],
+            total_count=job["total_count"]
+        )
+        await self.record_recent_email(recent_email)
     
-    async def send_email_to_employees(self, send_request: EmailSendRequest) -> EmailSendResult:
+    async def stream_draft_batch(self, batch_request: DraftBatchRequest) -> AsyncIterator[Dict[str, Any]]:
+        started = time.perf_counter()
+        drafts = [draft.model_dump() for draft in batch_request.drafts]
+        succeeded = 0
+        
+        with self.tracer.detached_span("draft.batch", drafts=len(drafts)) as span:
+            async for index, email_draft, error in self.tracer.iterate(span, self.agent_graph.llm_service.generate_email_batch(drafts)):
+                if error is None:
+                    succeeded += 1
+                    yield {"event": "draft", "index": index, "topic": drafts[index]["topic"], "email_draft": email_draft}
+                else:
+                    yield {"event": "error", "index": index, "topic": drafts[index]["topic"], "detail": str(error)}
+            span.set(succeeded=succeeded)
+        
+        yield {
+            "event": "summary",
+            "total_count": len(drafts),
+            "succeeded_count": succeeded,
+            "failed_count": len(drafts) - succeeded,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)
+        }
+    
+    async def stream_send(self, send_request: EmailSendRequest) -> AsyncIterator[Dict[str, Any]]:
+        recipients = normalize_recipients(send_request.employee_emails)
+        total_count = len(recipients)
+        success_count = 0
+        completed_count = 0
+        
         try:
-            results = await self.email_service.send_email_to_employees(
-                send_request.employee_emails, 
-                send_request.subject, 
+            async for chunk_result in self.email_service.stream_campaign(
+                recipients,
+                send_request.subject,
                 send_request.body
-            )
-            
-            success_count = sum(1 for success in results.values() if success)
-            total_count = len(send_request.employee_emails)
+            ):
+                failed = [email for email, outcome in chunk_result.items() if not outcome["success"]]
+                success_count += len(chunk_result) - len(failed)
+                completed_count += len(chunk_result)
+                yield {
+                    "event": "progress",
+                    "completed_count": completed_count,
+                    "sent_count": success_count,
+                    "failed_count": completed_count - success_count,
+                    "total_count": total_count,
+                    "failed": failed
+                }
             
-            recent_email = RecentEmail(
-                subject=send_request.subject,
-                body=send_request.body,
-                recipients=send_request.employee_emails,
-                sent_at=datetime.now(),
-                success_count=success_count,
-                total_count=total_count
-            )
-            self.recent_emails.append(recent_email)
-            
-            return EmailSendResult(
-                success=success_count > 0,
-                sent_count=success_count,
-                total_count=total_count,
-                results=results,
-                message=f"Email sent successfully to {success_count} out of {total_count} recipients" if success_count > 0 else "Failed to send email to any recipients",
-                timestamp=datetime.now()
-            )
+            if success_count > 0:
+                recent_email = RecentEmail(
+                    subject=send_request.subject,
+                    body=send_request.body,
+                    recipients=recipients,
+                    sent_at=datetime.now(),
+                    success_count=success_count,
+                    total_count=total_count
+                )
+                await self.record_recent_email(recent_email)
             
+            message = f"Email sent successfully to {success_count} out of {total_count} recipients" if success_count > 0 else "Failed to send email to any recipients"
         except Exception as e:
-            return EmailSendResult(
-                success=False,
-                sent_count=0,
-                total_count=len(send_request.employee_emails),
-                results={},
-                message=f"Failed to send emails: {str(e)}",
-                timestamp=datetime.now()
-            )
+            message = f"Failed to send emails: {str(e)}"
+        
+        yield {
+            "event": "summary",
+            "success": success_count > 0,
+            "sent_count": success_count,
+            "failed_count": completed_count - success_count,
+            "total_count": total_count,
+            "message": message,
+            "timestamp": datetime.now().isoformat()
+        }
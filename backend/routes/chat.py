@@ -1,18 +1,78 @@
-from fastapi import APIRouter, HTTPException
-from typing import Dict, Any
-from ..schemas.email import ChatMessage
+from fastapi import APIRouter, HTTPException, Header, Query, Depends
+from fastapi.responses import StreamingResponse, PlainTextResponse
+from typing import Dict, Any, Optional, AsyncIterator, Literal
+import json
+from ..schemas.email import ChatMessage, DraftBatchRequest
 from ..interactors.email import EmailInteractor
+from ..container import ServiceContainer
+from .dependencies import get_container, get_email_interactor
+from ..services.idempotency import IdempotencyConflictError
 
 router = APIRouter(prefix="/chat", tags=["chat"])
-email_interactor = EmailInteractor()
 
 @router.post("/message")
-async def process_chat_message(chat_message: ChatMessage) -> Dict[str, Any]:
+async def process_chat_message(chat_message: ChatMessage, idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"), email_interactor: EmailInteractor = Depends(get_email_interactor)) -> Dict[str, Any]:
     try:
         result = await email_interactor.process_chat_message(
             chat_message.message,
-            chat_message.employee_emails
+            chat_message.employee_emails,
+            idempotency_key,
+            chat_message.thread_id
         )
         return result
+    except IdempotencyConflictError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+@router.post("/message/stream")
+async def stream_chat_message(chat_message: ChatMessage, idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"), email_interactor: EmailInteractor = Depends(get_email_interactor)) -> StreamingResponse:
+    async def events() -> AsyncIterator[str]:
+        try:
+            async for event in email_interactor.stream_chat_message(
+                chat_message.message,
+                chat_message.employee_emails,
+                idempotency_key,
+                chat_message.thread_id
+            ):
+                yield json.dumps(event) + "\n"
+        except IdempotencyConflictError as e:
+            yield json.dumps({"event": "error", "status_code": 422, "detail": str(e)}) + "\n"
+        except Exception as e:
+            yield json.dumps({"event": "error", "status_code": 500, "detail": f"Internal server error: {str(e)}"}) + "\n"
+    
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+@router.post("/drafts/batch")
+async def generate_draft_batch(batch_request: DraftBatchRequest, email_interactor: EmailInteractor = Depends(get_email_interactor)) -> StreamingResponse:
+    async def events() -> AsyncIterator[str]:
+        async for event in email_interactor.stream_draft_batch(batch_request):
+            yield json.dumps(event) + "\n"
+    
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+@router.get("/cache")
+async def get_draft_cache_stats(container: ServiceContainer = Depends(get_container)) -> Dict[str, Any]:
+    return {**container.draft_cache.get_stats(), "coalescing": container.single_flight.get_stats()}
+
+@router.get("/parse-stats")
+async def get_draft_parse_stats(container: ServiceContainer = Depends(get_container)) -> Dict[str, Any]:
+    return container.parse_stats.get_stats()
+
+@router.get("/llm-metrics")
+async def get_llm_metrics(format: Literal["json", "prometheus"] = Query("json"), container: ServiceContainer = Depends(get_container)):
+    metrics = container.llm_metrics
+    if format == "prometheus":
+        return PlainTextResponse(metrics.export_prometheus(), media_type="text/plain; version=0.0.4")
+    return metrics.snapshot()
+
+@router.get("/traces")
+async def get_traces(limit: int = Query(20, ge=1, le=200), order: Literal["recent", "slowest"] = Query("recent"), name: Optional[str] = Query(None), container: ServiceContainer = Depends(get_container)) -> Dict[str, Any]:
+    return {"traces": container.tracer.get_traces(limit, order, name)}
+
+@router.get("/traces/{trace_id}")
+async def get_trace(trace_id: str, container: ServiceContainer = Depends(get_container)) -> Dict[str, Any]:
+    trace = container.tracer.get_trace(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="Trace not found")
+    return trace
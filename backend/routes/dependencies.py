@@ -0,0 +1,9 @@
+from fastapi import Request
+from ..container import ServiceContainer
+from ..interactors.email import EmailInteractor
+
+def get_container(request: Request) -> ServiceContainer:
+    return request.app.state.container
+
+def get_email_interactor(request: Request) -> EmailInteractor:
+    return get_container(request).email_interactor
@@ -1,23 +1,62 @@
-from fastapi import APIRouter, HTTPException
-from typing import Dict, Any, List
-from ..schemas.email import EmailSendRequest, EmailSendResult, RecentEmail
+from fastapi import APIRouter, HTTPException, Header, Query, Depends, Response
+from fastapi.responses import StreamingResponse
+from typing import Dict, Any, List, Optional, AsyncIterator, Literal
+from datetime import datetime
+import json
+from ..schemas.email import EmailSendRequest, EmailSendJob, RecentEmail
 from ..interactors.email import EmailInteractor
+from .dependencies import get_email_interactor
+from ..services.idempotency import IdempotencyConflictError
+from ..services.history import InvalidCursorError
 
 router = APIRouter(prefix="/email", tags=["email"])
-email_interactor = EmailInteractor()
 
-@router.post("/send", response_model=EmailSendResult)
-async def send_email_to_employees(send_request: EmailSendRequest) -> EmailSendResult:
+@router.post("/send", response_model=EmailSendJob, status_code=202)
+async def send_email_to_employees(send_request: EmailSendRequest, idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"), email_interactor: EmailInteractor = Depends(get_email_interactor)) -> EmailSendJob:
     try:
-        result = await email_interactor.send_email_to_employees(send_request)
+        result = await email_interactor.enqueue_send(send_request, idempotency_key)
         return result
+    except IdempotencyConflictError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
+@router.post("/send/stream")
+async def stream_email_to_employees(send_request: EmailSendRequest, format: Literal["ndjson", "sse"] = Query("ndjson"), email_interactor: EmailInteractor = Depends(get_email_interactor)) -> StreamingResponse:
+    async def ndjson_events() -> AsyncIterator[str]:
+        async for event in email_interactor.stream_send(send_request):
+            yield json.dumps(event) + "\n"
+    
+    async def sse_events() -> AsyncIterator[str]:
+        async for event in email_interactor.stream_send(send_request):
+            yield f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+    
+    if format == "sse":
+        return StreamingResponse(sse_events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+    return StreamingResponse(ndjson_events(), media_type="application/x-ndjson")
+
+@router.get("/jobs/{job_id}", response_model=EmailSendJob)
+async def get_send_job(job_id: str, email_interactor: EmailInteractor = Depends(get_email_interactor)) -> EmailSendJob:
+    try:
+        result = await email_interactor.get_send_job(job_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"Send job {job_id} not found")
+    return result
+
 @router.get("/recent", response_model=List[RecentEmail])
-async def get_recent_emails(limit: int = 10) -> List[RecentEmail]:
+async def get_recent_emails(response: Response, limit: int = Query(10, ge=1, le=100), cursor: Optional[str] = None, since: Optional[datetime] = None, until: Optional[datetime] = None, recipient: Optional[str] = None, email_interactor: EmailInteractor = Depends(get_email_interactor)) -> List[RecentEmail]:
     try:
-        result = email_interactor.get_recent_emails(limit)
+        result, next_cursor = await email_interactor.get_recent_emails(limit, cursor, since, until, recipient)
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
         return result
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+@router.get("/speculation")
+async def get_speculation_stats(email_interactor: EmailInteractor = Depends(get_email_interactor)) -> Dict[str, Any]:
+    return email_interactor.email_service.get_speculation_stats()
@@ -1,13 +1,17 @@
 from .email import (
     EmailSendRequest,
     ChatMessage,
-    EmailSendResult,
-    RecentEmail
+    DraftRequest,
+    DraftBatchRequest,
+    RecentEmail,
+    EmailSendJob
 )
 
 __all__ = [
     "EmailSendRequest",
     "ChatMessage",
-    "EmailSendResult",
-    "RecentEmail"
+    "DraftRequest",
+    "DraftBatchRequest",
+    "RecentEmail",
+    "EmailSendJob"
 ]
\ No newline at end of file
@@ -10,14 +10,15 @@ class EmailSendRequest(BaseModel):
 class ChatMessage(BaseModel):
     message: str = Field(..., min_length=1, max_length=2000)
     employee_emails: Optional[List[EmailStr]] = None
+    thread_id: Optional[str] = Field(None, min_length=1, max_length=128)
 
-class EmailSendResult(BaseModel):
-    success: bool
-    sent_count: int
-    total_count: int
-    results: dict
-    message: str
-    timestamp: Optional[datetime] = None
+class DraftRequest(BaseModel):
+    topic: str = Field(..., min_length=1, max_length=500)
+    context: str = Field("", max_length=2000)
+    regenerate: bool = False
+
+class DraftBatchRequest(BaseModel):
+    drafts: List[DraftRequest] = Field(..., min_length=1, max_length=100)
 
 class RecentEmail(BaseModel):
     id: Optional[int] = None
@@ -26,4 +27,15 @@ class RecentEmail(BaseModel):
     recipients: List[str]
     sent_at: datetime
     success_count: int
-    total_count: int
\ No newline at end of file
+    total_count: int
+
+class EmailSendJob(BaseModel):
+    job_id: str
+    status: str
+    subject: str
+    total_count: int
+    queued_count: int
+    sent_count: int
+    failed_count: int
+    created_at: datetime
+    updated_at: datetime
\ No newline at end of file
@@ -0,0 +1,101 @@
+import os
+import re
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from dotenv import load_dotenv
+from typing import Any, Dict, Optional
+from .state import connect_sqlite
+
+load_dotenv()
+
+def normalize_prompt_text(text: str) -> str:
+    return re.sub(r"\s+", " ", (text or "").lower()).strip(" .!?")
+
+def draft_cache_key(topic: str, context: str, today_date: str, model: str, temperature: float) -> str:
+    parts = [normalize_prompt_text(topic), normalize_prompt_text(context), today_date, model, temperature]
+    return hashlib.sha256(json.dumps(parts).encode("utf-8")).hexdigest()
+
+class DraftCache:
+    def __init__(self, db_path: str = None, max_entries: int = None, ttl_seconds: float = None, disk_ttl_seconds: float = None):
+        data_dir = os.environ.get("CORPMAIL_DATA_DIR", "data")
+        self.db_path = db_path or os.environ.get("DRAFT_CACHE_DB", os.path.join(data_dir, "draft_cache.db"))
+        self.max_entries = max_entries if max_entries is not None else int(os.environ.get("DRAFT_CACHE_SIZE", "256"))
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(os.environ.get("DRAFT_CACHE_TTL_SECONDS", "3600"))
+        self.disk_ttl_seconds = disk_ttl_seconds if disk_ttl_seconds is not None else float(os.environ.get("DRAFT_CACHE_DISK_TTL_SECONDS", "86400"))
+        self.memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "bypasses": 0, "writes": 0}
+        self.lock = threading.Lock()
+
+        self.connection = connect_sqlite(self.db_path)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS drafts (key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)")
+        self.connection.execute("DELETE FROM drafts WHERE created_at < ?", (time.time() - self.disk_ttl_seconds,))
+        self.connection.commit()
+
+    async def get(self, key: str) -> Optional[str]:
+        entry = self.memory.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self.memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return value
+            del self.memory[key]
+
+        value = await asyncio.to_thread(self.read_disk, key)
+        if value is not None:
+            self.stats["disk_hits"] += 1
+            self.remember(key, value)
+            return value
+
+        self.stats["misses"] += 1
+        return None
+
+    async def set(self, key: str, value: str) -> None:
+        self.remember(key, value)
+        self.stats["writes"] += 1
+        await asyncio.to_thread(self.write_disk, key, value)
+
+    def record_bypass(self) -> None:
+        self.stats["bypasses"] += 1
+
+    def remember(self, key: str, value: str) -> None:
+        self.memory[key] = (time.monotonic() + self.ttl_seconds, value)
+        self.memory.move_to_end(key)
+        while len(self.memory) > max(1, self.max_entries):
+            self.memory.popitem(last=False)
+
+    def read_disk(self, key: str) -> Optional[str]:
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT value FROM drafts WHERE key = ? AND created_at >= ?",
+                (key, time.time() - self.disk_ttl_seconds)
+            ).fetchone()
+        return row[0] if row else None
+
+    def write_disk(self, key: str, value: str) -> None:
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO drafts (key, value, created_at) VALUES (?, ?, ?)",
+                (key, value, time.time())
+            )
+
+    async def aclose(self) -> None:
+        with self.lock:
+            self.connection.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats["memory_hits"] + self.stats["disk_hits"] + self.stats["misses"]
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        return {**self.stats, "memory_entries": len(self.memory), "hit_rate": hits / lookups if lookups else 0.0}
+
+shared_cache: Optional[DraftCache] = None
+
+def get_shared_draft_cache() -> DraftCache:
+    global shared_cache
+    if shared_cache is None:
+        shared_cache = DraftCache()
+    return shared_cache
@@ -0,0 +1,82 @@
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, Optional
+
+class SingleFlight:
+    def __init__(self):
+        self.calls: Dict[Hashable, Dict[str, Any]] = {}
+        self.stats = {"leaders": 0, "joined": 0, "abandoned": 0}
+
+    async def run(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        call = self.enter(key, lambda call: factory())
+        try:
+            return await asyncio.shield(call["task"])
+        finally:
+            self.leave(key, call)
+
+    async def stream(self, key: Hashable, factory: Callable[[], AsyncIterator[Any]]) -> AsyncIterator[Any]:
+        call = self.enter(key, lambda call: self.pump(call, factory()))
+        try:
+            index = 0
+            while True:
+                updated = call["updated"]
+                while index < len(call["events"]):
+                    yield call["events"][index]
+                    index += 1
+                if call["task"].done():
+                    call["task"].result()
+                    return
+                await updated.wait()
+        finally:
+            self.leave(key, call)
+
+    async def pump(self, call: Dict[str, Any], events: AsyncIterator[Any]) -> None:
+        try:
+            async for event in events:
+                call["events"].append(event)
+                self.wake(call)
+        finally:
+            self.wake(call)
+
+    def wake(self, call: Dict[str, Any]) -> None:
+        call["updated"].set()
+        call["updated"] = asyncio.Event()
+
+    def enter(self, key: Hashable, factory: Callable[[Dict[str, Any]], Awaitable[Any]]) -> Dict[str, Any]:
+        call = self.calls.get(key)
+        if call is None or call["task"].cancelled():
+            call = {"waiters": 0, "events": [], "updated": asyncio.Event()}
+            task = asyncio.ensure_future(factory(call))
+            call["task"] = task
+            self.calls[key] = call
+            task.add_done_callback(lambda done: self.forget(key, done))
+            self.stats["leaders"] += 1
+        else:
+            self.stats["joined"] += 1
+        call["waiters"] += 1
+        return call
+
+    def leave(self, key: Hashable, call: Dict[str, Any]) -> None:
+        call["waiters"] -= 1
+        if call["waiters"] == 0 and not call["task"].done():
+            self.stats["abandoned"] += 1
+            call["task"].cancel()
+            if self.calls.get(key) is call:
+                self.calls.pop(key, None)
+
+    def forget(self, key: Hashable, task: asyncio.Future) -> None:
+        call = self.calls.get(key)
+        if call is not None and call["task"] is task:
+            del self.calls[key]
+        if not task.cancelled():
+            task.exception()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "in_flight": len(self.calls)}
+
+shared_single_flight: Optional[SingleFlight] = None
+
+def get_shared_single_flight() -> SingleFlight:
+    global shared_single_flight
+    if shared_single_flight is None:
+        shared_single_flight = SingleFlight()
+    return shared_single_flight
@@ -0,0 +1,20 @@
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Iterable, Set
+
+async def bounded_as_completed(awaitables: Iterable[Awaitable[Any]], limit: int) -> AsyncIterator[Any]:
+    pending: Set[asyncio.Future] = set()
+    try:
+        for awaitable in awaitables:
+            pending.add(asyncio.ensure_future(awaitable))
+            if len(pending) >= max(1, limit):
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+    finally:
+        for task in pending:
+            task.cancel()
@@ -1,28 +1,125 @@
 from langgraph.graph import StateGraph, END, START
 from langgraph.prebuilt import ToolNode
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, ToolMessage
-from typing import TypedDict, Annotated, List, Dict, Any, Literal
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+from dotenv import load_dotenv
+from typing import TypedDict, Annotated, List, Dict, Any, Literal, Optional
+import os
 import json
+import time
+import asyncio
+import sqlite3
+import aiosqlite
 from .llm import LLMService
-from .tool import AGENT_TOOLS
+from langchain_core.tools import BaseTool
+from .sendgrid import EmailService
+from .tool import create_agent_tools
+from .tracing import Tracer, get_shared_tracer, message_stats
+from langchain_core.runnables import RunnableConfig
+
+load_dotenv()
 
 class AgentState(TypedDict):
     messages: Annotated[List[BaseMessage], "The list of messages in the conversation"]
     employee_emails: List[str]
     pending_email: Dict[str, str]  
+    pending_topic: str
 
 class EmailAgentGraph:
-    def __init__(self):
-        self.llm_service = LLMService()
+    def __init__(self, llm_service: LLMService = None, tools: List[BaseTool] = None, db_path: str = None, idle_ttl_seconds: float = None, tracer: Tracer = None):
+        self.tracer = tracer or get_shared_tracer()
+        self.llm_service = llm_service or LLMService(tracer=self.tracer)
+        self.tools = tools or create_agent_tools(self.llm_service, EmailService(tracer=self.tracer), tracer=self.tracer)
         self.graph = self.create_graph()
+        data_dir = os.environ.get("CORPMAIL_DATA_DIR", "data")
+        self.db_path = db_path or os.environ.get("CONVERSATION_DB", os.path.join(data_dir, "conversations.db"))
+        self.idle_ttl_seconds = idle_ttl_seconds if idle_ttl_seconds is not None else float(os.environ.get("CONVERSATION_IDLE_TTL_SECONDS", "3600"))
+        self.eviction_interval = float(os.environ.get("CONVERSATION_EVICTION_INTERVAL_SECONDS", "60"))
+        self.last_eviction = 0.0
+        self.connection: Optional[aiosqlite.Connection] = None
+        self.checkpointer: Optional[AsyncSqliteSaver] = None
+        self.persistent_graph = None
+        self.open_lock = asyncio.Lock()
+    
+    async def get_persistent_graph(self):
+        async with self.open_lock:
+            if self.persistent_graph is None:
+                if os.path.dirname(self.db_path):
+                    os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+                self.connection = await aiosqlite.connect(self.db_path, timeout=30)
+                for attempt in range(50):
+                    try:
+                        await self.connection.execute("PRAGMA journal_mode=WAL")
+                        break
+                    except sqlite3.OperationalError:
+                        if attempt == 49:
+                            raise
+                        await asyncio.sleep(0.1)
+                await self.connection.execute("CREATE TABLE IF NOT EXISTS thread_activity (thread_id TEXT PRIMARY KEY, last_seen REAL NOT NULL)")
+                await self.connection.execute("CREATE INDEX IF NOT EXISTS idx_thread_activity_last_seen ON thread_activity (last_seen)")
+                await self.connection.commit()
+                self.checkpointer = AsyncSqliteSaver(self.connection)
+                self.persistent_graph = self.create_graph(self.checkpointer)
+        return self.persistent_graph
+    
+    async def aclose(self) -> None:
+        if self.connection is not None:
+            await self.connection.close()
+            self.connection = None
+            self.checkpointer = None
+            self.persistent_graph = None
+    
+    async def touch_thread(self, thread_id: str) -> None:
+        now = time.time()
+        async with self.connection.execute("SELECT last_seen FROM thread_activity WHERE thread_id = ?", (thread_id,)) as cursor:
+            row = await cursor.fetchone()
+        if row is not None and row[0] < now - self.idle_ttl_seconds:
+            await self.checkpointer.adelete_thread(thread_id)
+        await self.connection.execute(
+            "INSERT INTO thread_activity (thread_id, last_seen) VALUES (?, ?) ON CONFLICT(thread_id) DO UPDATE SET last_seen = excluded.last_seen",
+            (thread_id, now)
+        )
+        await self.connection.commit()
+        
+        if now - self.last_eviction >= self.eviction_interval:
+            self.last_eviction = now
+            await self.evict_idle_threads(now)
+    
+    async def evict_idle_threads(self, now: float = None) -> int:
+        cutoff = (now or time.time()) - self.idle_ttl_seconds
+        async with self.connection.execute("SELECT thread_id FROM thread_activity WHERE last_seen < ?", (cutoff,)) as cursor:
+            idle = [row[0] for row in await cursor.fetchall()]
+        for thread_id in idle:
+            await self.checkpointer.adelete_thread(thread_id)
+        if idle:
+            await self.connection.executemany("DELETE FROM thread_activity WHERE thread_id = ? AND last_seen < ?", [(thread_id, cutoff) for thread_id in idle])
+            await self.connection.commit()
+        return len(idle)
+    
+    async def get_pending_email(self, thread_id: str) -> Dict[str, str]:
+        graph = await self.get_persistent_graph()
+        await self.touch_thread(thread_id)
+        snapshot = await graph.aget_state({"configurable": {"thread_id": thread_id}})
+        return snapshot.values.get("pending_email", {}) if snapshot.values else {}
     
-    def create_graph(self):
+    async def set_pending_email(self, thread_id: str, pending_email: Dict[str, str]) -> None:
+        graph = await self.get_persistent_graph()
+        await self.touch_thread(thread_id)
+        await graph.aupdate_state({"configurable": {"thread_id": thread_id}}, {"pending_email": pending_email}, as_node="agent")
+    
+    def create_graph(self, checkpointer: AsyncSqliteSaver = None):
         workflow = StateGraph(AgentState)
         
-        tool_node = ToolNode(AGENT_TOOLS)
+        tool_node = ToolNode(self.tools)
+        
+        async def run_agent(state: AgentState, config: RunnableConfig) -> Dict[str, Any]:
+            return await self.call_model(state)
         
-        workflow.add_node("agent", self.call_model)
-        workflow.add_node("tools", tool_node)
+        async def run_tools(state: AgentState, config: RunnableConfig) -> Dict[str, Any]:
+            return await tool_node.ainvoke(state, config)
+        
+        workflow.add_node("agent", self.traced_node("agent", run_agent))
+        workflow.add_node("tools", self.traced_node("tools", run_tools))
         
         workflow.add_edge(START, "agent")
         
@@ -37,37 +134,75 @@ class EmailAgentGraph:
         
         workflow.add_edge("tools", "agent")
         
-        return workflow.compile()
+        return workflow.compile(checkpointer=checkpointer)
+    
+    def traced_node(self, name: str, node):
+        async def run(state: AgentState, config: RunnableConfig) -> Dict[str, Any]:
+            with self.tracer.span(f"graph.{name}", **message_stats(state.get("messages", []))) as span:
+                result = await node(state, config)
+                messages = result.get("messages", []) if isinstance(result, dict) else []
+                stats = message_stats(messages)
+                span.set(output_message_count=stats["message_count"], output_payload_bytes=stats["payload_bytes"])
+                return result
+        return run
     
     async def call_model(self, state: AgentState) -> AgentState:
         messages = state["messages"]
         employee_emails = state.get("employee_emails", [])
+        pending_email = state.get("pending_email") or {}
+        pending_topic = state.get("pending_topic", "")
+        
+        for msg in reversed(messages):
+            if isinstance(msg, ToolMessage):
+                tool_result = self.parse_tool_result(msg)
+                if "subject" in tool_result and "body" in tool_result:
+                    pending_email = {"subject": tool_result["subject"], "body": tool_result["body"], "topic": pending_topic or tool_result["subject"]}
+                break
         
-        response = await self.llm_service.generate_response_with_tools(messages, employee_emails)
+        response = await self.llm_service.generate_response_with_tools(messages, employee_emails, pending_email)
+        for tool_call in response.tool_calls:
+            if tool_call["name"] == "generate_professional_email":
+                pending_topic = tool_call["args"]["topic"]
         
         return {
             **state,
-            "messages": messages + [response]
+            "messages": messages + [response],
+            "pending_email": pending_email,
+            "pending_topic": pending_topic
         }
     
+    def parse_tool_result(self, msg: ToolMessage) -> Dict[str, Any]:
+        try:
+            tool_result = json.loads(msg.content)
+        except (TypeError, ValueError):
+            return {}
+        return tool_result if isinstance(tool_result, dict) else {}
+    
     def should_continue(self, state: AgentState) -> Literal["tools", "end"]:
+        if not state.get("messages"):
+            return "end"
         last_message = state["messages"][-1]
         
         if isinstance(last_message, AIMessage) and hasattr(last_message, 'tool_calls') and last_message.tool_calls:
             return "tools"
         return "end"
     
-    async def process_message(self, message: str, employee_emails: List[str] = None) -> Dict[str, Any]:
+    async def process_message(self, message: str, employee_emails: List[str] = None, thread_id: Optional[str] = None) -> Dict[str, Any]:
         if employee_emails is None:
             employee_emails = []
         
-        initial_state = {
-            "messages": [HumanMessage(content=message)],
-            "employee_emails": employee_emails,
-            "pending_email": {}
-        }
-        
-        result = await self.graph.ainvoke(initial_state)
+        if thread_id:
+            graph = await self.get_persistent_graph()
+            await self.touch_thread(thread_id)
+            config = {"configurable": {"thread_id": thread_id}}
+            result = await graph.ainvoke({"messages": [HumanMessage(content=message)], "employee_emails": employee_emails}, config)
+        else:
+            initial_state = {
+                "messages": [HumanMessage(content=message)],
+                "employee_emails": employee_emails,
+                "pending_email": {}
+            }
+            result = await self.graph.ainvoke(initial_state)
         
         final_response = ""
         email_draft = ""
@@ -75,15 +210,14 @@ class EmailAgentGraph:
         
         for msg in result["messages"]:
             if isinstance(msg, ToolMessage):
-                try:
-                    tool_result = json.loads(msg.content)
-                    if "subject" in tool_result and "body" in tool_result:
-                        email_draft = msg.content
-                        result["pending_email"] = tool_result
-                    elif "sent_count" in tool_result and "total_count" in tool_result:
-                        send_result = tool_result
-                except:
-                    pass
+                tool_result = self.parse_tool_result(msg)
+                if "subject" in tool_result and "body" in tool_result:
+                    email_draft = msg.content
+                elif "sent_count" in tool_result and "total_count" in tool_result:
+                    send_result = tool_result
+        
+        if thread_id and send_result and send_result.get("success"):
+            await graph.aupdate_state(config, {"pending_email": {}}, as_node="agent")
         
         for msg in reversed(result["messages"]):
             if isinstance(msg, AIMessage):
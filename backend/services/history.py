@@ -0,0 +1,146 @@
+import os
+import json
+import base64
+import asyncio
+import threading
+from collections import deque
+from datetime import datetime
+from dotenv import load_dotenv
+from typing import Any, Dict, List, Optional, Tuple
+from .sendgrid import normalize_recipients, recipient_key
+from .state import connect_sqlite
+
+load_dotenv()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sent_emails (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    subject TEXT NOT NULL,
+    body TEXT NOT NULL,
+    recipients TEXT NOT NULL,
+    sent_at REAL NOT NULL,
+    success_count INTEGER NOT NULL,
+    total_count INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_sent_emails_sent_at ON sent_emails (sent_at, id);
+CREATE TABLE IF NOT EXISTS sent_email_recipients (
+    recipient TEXT NOT NULL,
+    sent_at REAL NOT NULL,
+    email_id INTEGER NOT NULL,
+    PRIMARY KEY (recipient, sent_at, email_id)
+) WITHOUT ROWID;
+"""
+
+class InvalidCursorError(ValueError):
+    pass
+
+def encode_cursor(sent_at: float, email_id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps([sent_at, email_id]).encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[float, int]:
+    try:
+        sent_at, email_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return float(sent_at), int(email_id)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursorError(f"Invalid cursor: {cursor}") from e
+
+class EmailHistory:
+    def __init__(self, db_path: str = None, hot_window: int = None):
+        data_dir = os.environ.get("CORPMAIL_DATA_DIR", "data")
+        self.db_path = db_path or os.environ.get("HISTORY_DB", os.path.join(data_dir, "email_history.db"))
+        self.hot_window = hot_window if hot_window is not None else int(os.environ.get("HISTORY_HOT_WINDOW", "100"))
+        self.hot: deque = deque(maxlen=max(1, self.hot_window))
+        self.hot_max_id: Optional[int] = None
+        self.lock = threading.Lock()
+
+        self.connection = connect_sqlite(self.db_path)
+        self.connection.executescript(SCHEMA)
+        self.connection.commit()
+
+    async def record(self, email: Dict[str, Any]) -> Dict[str, Any]:
+        stored = await asyncio.to_thread(self.insert_email, email)
+        if self.hot_max_id is not None and stored["id"] == self.hot_max_id + 1:
+            self.hot.appendleft(stored)
+            self.hot_max_id = stored["id"]
+        else:
+            self.hot_max_id = None
+        return stored
+
+    async def aclose(self) -> None:
+        with self.lock:
+            self.connection.close()
+
+    async def query(self, limit: int = 10, cursor: str = None, since: datetime = None, until: datetime = None, recipient: str = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        position = decode_cursor(cursor) if cursor else None
+        if position is None and since is None and until is None and not recipient and limit < self.hot.maxlen:
+            emails = await self.read_hot(limit + 1)
+        else:
+            emails = await asyncio.to_thread(self.select_emails, limit + 1, position, since, until, recipient)
+
+        if len(emails) <= limit:
+            return emails, None
+        emails = emails[:limit]
+        return emails, encode_cursor(emails[-1]["sent_at"].timestamp(), emails[-1]["id"])
+
+    async def read_hot(self, limit: int) -> List[Dict[str, Any]]:
+        max_id = await asyncio.to_thread(self.latest_id)
+        if max_id != self.hot_max_id:
+            self.hot = deque(await asyncio.to_thread(self.select_emails, self.hot.maxlen, None, None, None, None), maxlen=self.hot.maxlen)
+            self.hot_max_id = max_id
+        return list(self.hot)[:limit]
+
+    def insert_email(self, email: Dict[str, Any]) -> Dict[str, Any]:
+        sent_at = email["sent_at"].timestamp()
+        with self.lock, self.connection:
+            cursor = self.connection.execute(
+                "INSERT INTO sent_emails (subject, body, recipients, sent_at, success_count, total_count) VALUES (?, ?, ?, ?, ?, ?)",
+                (email["subject"], email["body"], json.dumps(email["recipients"]), sent_at, email["success_count"], email["total_count"])
+            )
+            email_id = cursor.lastrowid
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO sent_email_recipients (recipient, sent_at, email_id) VALUES (?, ?, ?)",
+                ((recipient_key(address), sent_at, email_id) for address in normalize_recipients(email["recipients"]))
+            )
+        return {**email, "id": email_id}
+
+    def latest_id(self) -> Optional[int]:
+        with self.lock:
+            return self.connection.execute("SELECT MAX(id) FROM sent_emails").fetchone()[0]
+
+    def select_emails(self, limit: int, position: Optional[Tuple[float, int]], since: Optional[datetime], until: Optional[datetime], recipient: Optional[str]) -> List[Dict[str, Any]]:
+        if recipient:
+            source = "sent_email_recipients AS r JOIN sent_emails AS e ON e.id = r.email_id"
+            sent_at, email_id = "r.sent_at", "r.email_id"
+            conditions, params = ["r.recipient = ?"], [recipient_key(recipient)]
+        else:
+            source = "sent_emails AS e"
+            sent_at, email_id = "e.sent_at", "e.id"
+            conditions, params = [], []
+
+        if since is not None:
+            conditions.append(f"{sent_at} >= ?")
+            params.append(since.timestamp())
+        if until is not None:
+            conditions.append(f"{sent_at} < ?")
+            params.append(until.timestamp())
+        if position is not None:
+            conditions.append(f"({sent_at} < ? OR ({sent_at} = ? AND {email_id} < ?))")
+            params.extend([position[0], position[0], position[1]])
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        sql = f"SELECT e.* FROM {source} {where} ORDER BY {sent_at} DESC, {email_id} DESC LIMIT ?"
+        with self.lock:
+            rows = self.connection.execute(sql, (*params, limit)).fetchall()
+        return [self.to_email(row) for row in rows]
+
+    def to_email(self, row: Tuple[Any, ...]) -> Dict[str, Any]:
+        email_id, subject, body, recipients, sent_at, success_count, total_count = row
+        return {
+            "id": email_id,
+            "subject": subject,
+            "body": body,
+            "recipients": json.loads(recipients),
+            "sent_at": datetime.fromtimestamp(sent_at),
+            "success_count": success_count,
+            "total_count": total_count
+        }
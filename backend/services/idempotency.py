@@ -0,0 +1,155 @@
+import os
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from dotenv import load_dotenv
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+from .state import StateStore
+
+load_dotenv()
+
+class IdempotencyConflictError(Exception):
+    pass
+
+def fingerprint(*parts: Any) -> str:
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+class IdempotencyCache:
+    def __init__(self, ttl_seconds: float = None, max_entries: int = None, store: StateStore = None, wait_seconds: float = None):
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(os.environ.get("IDEMPOTENCY_TTL_SECONDS", "600"))
+        self.max_entries = max_entries if max_entries is not None else int(os.environ.get("IDEMPOTENCY_MAX_ENTRIES", "10000"))
+        self.wait_seconds = wait_seconds if wait_seconds is not None else float(os.environ.get("IDEMPOTENCY_WAIT_SECONDS", "60"))
+        self.store = store
+        self.in_flight: Dict[Hashable, Tuple[str, asyncio.Future]] = {}
+        self.completed: "OrderedDict[Hashable, Tuple[str, float, Any]]" = OrderedDict()
+
+    async def run(self, key: Hashable, request_fingerprint: str, factory: Callable[[], Awaitable[Any]], cache_if: Callable[[Any], bool] = None) -> Any:
+        self.evict_expired()
+
+        cached = self.completed.get(key)
+        if cached is not None:
+            self.check_fingerprint(key, cached[0], request_fingerprint)
+            return cached[2]
+
+        running = self.in_flight.get(key)
+        if running is not None:
+            self.check_fingerprint(key, running[0], request_fingerprint)
+            return await asyncio.shield(running[1])
+
+        task = asyncio.ensure_future(self.run_shared(key, request_fingerprint, factory, cache_if) if self.store else factory())
+        self.in_flight[key] = (request_fingerprint, task)
+        task.add_done_callback(lambda done: self.finish(key, request_fingerprint, done, cache_if))
+        return await asyncio.shield(task)
+
+    async def run_shared(self, key: Hashable, request_fingerprint: str, factory: Callable[[], Awaitable[Any]], cache_if: Callable[[Any], bool] = None) -> Any:
+        owned, result = await self.acquire(key, request_fingerprint)
+        if not owned:
+            return result
+        try:
+            result = await factory()
+        except BaseException as e:
+            await asyncio.shield(self.publish(key, request_fingerprint, error=e))
+            raise
+        await self.publish(key, request_fingerprint, result, cache_if=cache_if)
+        return result
+    
+    async def acquire(self, key: Hashable, request_fingerprint: str) -> Tuple[bool, Any]:
+        store_key = self.store_key(key)
+        deadline = time.monotonic() + self.wait_seconds
+        while True:
+            if await self.store.add(store_key, json.dumps({"fingerprint": request_fingerprint}), self.ttl_seconds):
+                return True, None
+            
+            stored = await self.store.get(store_key)
+            if stored is not None:
+                entry = json.loads(stored)
+                self.check_fingerprint(key, entry["fingerprint"], request_fingerprint)
+                if "result" in entry:
+                    return False, entry["result"]
+            if time.monotonic() > deadline:
+                raise IdempotencyConflictError(f"Idempotency-Key {key[-1] if isinstance(key, tuple) else key} is still being processed by another worker")
+            await asyncio.sleep(0.05)
+    
+    async def publish(self, key: Hashable, request_fingerprint: str, result: Any = None, error: BaseException = None, cache_if: Callable[[Any], bool] = None) -> None:
+        store_key = self.store_key(key)
+        if error is not None or (cache_if is not None and not cache_if(result)):
+            await self.store.delete(store_key)
+        else:
+            await self.store.set(store_key, json.dumps({"fingerprint": request_fingerprint, "result": result}, default=str), self.ttl_seconds)
+    
+    def store_key(self, key: Hashable) -> str:
+        return "idempotency:" + json.dumps(key, default=str)
+    
+    async def claim(self, key: Hashable, request_fingerprint: str) -> Optional[Awaitable[Any]]:
+        self.evict_expired()
+
+        cached = self.completed.get(key)
+        if cached is not None:
+            self.check_fingerprint(key, cached[0], request_fingerprint)
+            done = asyncio.get_running_loop().create_future()
+            done.set_result(cached[2])
+            return done
+
+        running = self.in_flight.get(key)
+        if running is not None:
+            self.check_fingerprint(key, running[0], request_fingerprint)
+            return asyncio.shield(running[1])
+
+        future = asyncio.get_running_loop().create_future()
+        self.in_flight[key] = (request_fingerprint, future)
+        if self.store is not None:
+            try:
+                owned, result = await self.acquire(key, request_fingerprint)
+            except BaseException as e:
+                self.settle(key, error=e)
+                raise
+            if not owned:
+                self.settle(key, result)
+                return future
+        return None
+
+    async def resolve(self, key: Hashable, result: Any = None, error: BaseException = None, cache_if: Callable[[Any], bool] = None) -> None:
+        entry = self.in_flight.get(key)
+        if entry is None:
+            return
+        self.settle(key, result, error, cache_if)
+        if self.store is not None:
+            await asyncio.shield(self.publish(key, entry[0], result, error, cache_if))
+
+    def settle(self, key: Hashable, result: Any = None, error: BaseException = None, cache_if: Callable[[Any], bool] = None) -> None:
+        entry = self.in_flight.get(key)
+        if entry is None:
+            return
+        future = entry[1]
+        if not future.done():
+            if error is not None:
+                future.set_exception(error)
+                future.exception()
+            else:
+                future.set_result(result)
+        self.finish(key, entry[0], future, cache_if)
+
+    def finish(self, key: Hashable, request_fingerprint: str, task: asyncio.Future, cache_if: Callable[[Any], bool] = None) -> None:
+        self.in_flight.pop(key, None)
+        if task.cancelled() or task.exception() is not None:
+            return
+        if cache_if is not None and not cache_if(task.result()):
+            return
+        self.completed[key] = (request_fingerprint, time.monotonic() + self.ttl_seconds, task.result())
+        self.completed.move_to_end(key)
+        while len(self.completed) > self.max_entries:
+            self.completed.popitem(last=False)
+
+    def evict_expired(self) -> None:
+        now = time.monotonic()
+        while self.completed:
+            key, (_, expires_at, _) = next(iter(self.completed.items()))
+            if expires_at > now:
+                break
+            self.completed.popitem(last=False)
+
+    def check_fingerprint(self, key: Hashable, stored: str, request_fingerprint: str) -> None:
+        if stored != request_fingerprint:
+            raise IdempotencyConflictError(f"Idempotency-Key {key[-1] if isinstance(key, tuple) else key} was already used for a different request")
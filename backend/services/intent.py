@@ -0,0 +1,101 @@
+from typing import Dict, Optional, Tuple
+
+GENERATE_PHRASES = (
+    "generate email", "write email", "create email", "email about", "write an email", "make email",
+    "regenerate email", "rewrite email", "enhance email",
+    "compose email", "draft email", "email on", "create a", "write a", "send a", "make a",
+    "announcement", "meeting", "holiday", "greeting", "update", "invite", "inform", "notify"
+)
+SEND_PHRASES = ("send email", "send it", "send the email")
+REGENERATE_PHRASES = ("enhance", "regenerate", "rewrite", "improve", "another version")
+REVISION_PHRASES = ("enhance it", "improve it", "rewrite it", "regenerate it", "another version")
+TOPIC_PATTERN_TIERS = (
+    (
+        "write an email about", "write email about", "email about",
+        "write an email on", "write email on", "email on",
+        "create email about", "create email on",
+        "make email about", "make email on",
+        "compose email about", "compose email on",
+        "draft email about", "draft email on",
+        "generate email about", "generate email on"
+    ),
+    ("write email", "create email", "make email", "compose email", "draft email", "generate email"),
+    ("create a", "write a", "send a", "make a", "make an", "create an", "write an")
+)
+DEFAULT_TOPIC = "General company communication"
+HELP_TEXT = "I am an email agent specialized in writing and sending professional emails. I can help you:\n\n• Generate professional emails for company communications\n• Write emails about meetings, announcements, holidays, etc.\n• Send emails to your employees\n\nPlease ask me to write or send an email, and I'll be happy to help!"
+
+def common_anchor(phrases: Tuple[str, ...]) -> str:
+    shortest = min(phrases, key=len)
+    for size in range(len(shortest), 0, -1):
+        for offset in range(len(shortest) - size + 1):
+            candidate = shortest[offset:offset + size]
+            if all(candidate in phrase for phrase in phrases):
+                return candidate
+    return ""
+
+def draft_topic(pending_email: Dict[str, str]) -> str:
+    return pending_email.get("topic") or pending_email.get("subject", "")
+
+class IntentMatch:
+    def __init__(self, intent: str, topic: str, topic_span: Optional[Tuple[int, int]], regenerate: bool):
+        self.intent = intent
+        self.topic = topic
+        self.topic_span = topic_span
+        self.regenerate = regenerate
+
+class IntentRouter:
+    def __init__(self):
+        self.generate_phrases = tuple(sorted(set(GENERATE_PHRASES), key=len))
+        self.send_phrases = tuple(sorted(set(SEND_PHRASES), key=len))
+        self.regenerate_phrases = tuple(sorted(set(REGENERATE_PHRASES), key=len))
+        self.revision_phrases = tuple(sorted(set(REVISION_PHRASES), key=len))
+        self.topic_tiers = tuple((common_anchor(tier), tier) for tier in TOPIC_PATTERN_TIERS)
+
+    def route(self, message: str) -> IntentMatch:
+        message_lower = message.lower()
+        contains = message_lower.__contains__
+
+        if any(map(contains, self.revision_phrases)):
+            return IntentMatch("regenerate", "", None, True)
+        if any(map(contains, self.generate_phrases)):
+            topic, topic_span = self.choose_topic(message_lower)
+            return IntentMatch("generate", topic, topic_span, any(map(contains, self.regenerate_phrases)))
+        if any(map(contains, self.send_phrases)):
+            return IntentMatch("send", "", None, False)
+        if any(map(contains, self.regenerate_phrases)):
+            return IntentMatch("regenerate", "", None, True)
+        return IntentMatch("help", "", None, False)
+
+    def extract_topic(self, message: str) -> Tuple[str, Optional[Tuple[int, int]]]:
+        return self.choose_topic(message.lower())
+
+    def choose_topic(self, message_lower: str) -> Tuple[str, Optional[Tuple[int, int]]]:
+        for anchor, tier in self.topic_tiers:
+            if anchor not in message_lower:
+                continue
+            for pattern in tier:
+                index = message_lower.rfind(pattern)
+                if index >= 0:
+                    span = self.span_after(message_lower, index + len(pattern))
+                    if span is not None:
+                        return message_lower[span[0]:span[1]], span
+
+        index = message_lower.rfind("announce")
+        if index >= 0:
+            pattern = "announce that" if "announce that" in message_lower else "announce"
+            index = message_lower.rfind(pattern)
+            span = self.span_after(message_lower, index + len(pattern))
+            if span is not None:
+                return message_lower[span[0]:span[1]], span
+
+        if message_lower:
+            return message_lower, (0, len(message_lower))
+        return DEFAULT_TOPIC, None
+
+    def span_after(self, text: str, start: int) -> Optional[Tuple[int, int]]:
+        end = len(text.rstrip())
+        start = len(text) - len(text[start:].lstrip())
+        return (start, end) if start < end else None
+
+intent_router = IntentRouter()
@@ -1,24 +1,155 @@
 import os
+import json
+import asyncio
 from dotenv import load_dotenv
-from groq import Groq
-from typing import List
+from typing import List, Dict, Any, Optional, Tuple, AsyncIterator
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
 from langchain_core.messages.tool import ToolCall
+from .llm_backends import LLMBackend, create_llm_backend
+from .cache import DraftCache, draft_cache_key, get_shared_draft_cache
+from .metrics import LLMMetrics, get_shared_llm_metrics
+from .coalesce import SingleFlight, get_shared_single_flight
+from .intent import intent_router, draft_topic, HELP_TEXT
+from .parsing import PartialEmailParser, ParseStats, EMAIL_SCHEMA, parse_email_json, get_shared_parse_stats
+from .tracing import Tracer, get_shared_tracer
+from .concurrency import bounded_as_completed
 
 load_dotenv()
 
+class LLMError(Exception):
+    def __init__(self, message: str, error_class: str):
+        super().__init__(message)
+        self.error_class = error_class
+
 class LLMService:
-    def __init__(self):
-        self.api_key = os.environ.get("GROQ_API_KEY")
-        if not self.api_key:
-            raise ValueError("GROQ_API_KEY environment variable must be set")
-        self.client = Groq(api_key=self.api_key)
-        self.model = "llama-3.1-8b-instant"
+    def __init__(self, draft_cache: DraftCache = None, single_flight: SingleFlight = None, metrics: LLMMetrics = None, backend: LLMBackend = None, tracer: Tracer = None, parse_stats: ParseStats = None):
+        self.backend = backend or create_llm_backend()
+        self.model = self.backend.model
+        self.temperature = 0.3
+        self.response_format = os.environ.get("GROQ_RESPONSE_FORMAT", "json_object")
+        self.batch_concurrency = int(os.environ.get("DRAFT_BATCH_CONCURRENCY", "8"))
+        self.draft_cache = draft_cache or get_shared_draft_cache()
+        self.single_flight = single_flight or get_shared_single_flight()
+        self.metrics = metrics or get_shared_llm_metrics()
+        self.tracer = tracer or get_shared_tracer()
+        self.parse_stats = parse_stats or get_shared_parse_stats()
+    
+    async def aclose(self) -> None:
+        await self.backend.aclose()
     
-    async def generate_email(self, topic: str, context: str = "") -> str:
+    async def generate_email(self, topic: str, context: str = "", bypass_cache: bool = False) -> str:
         from datetime import datetime
         today_date = datetime.now().strftime("%B %d, %Y")
         
+        cache_key = draft_cache_key(topic, context, today_date, self.model, self.temperature)
+        if bypass_cache:
+            self.draft_cache.record_bypass()
+        else:
+            cached = await self.draft_cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
+        return await self.single_flight.run(
+            (cache_key, bypass_cache),
+            lambda: self.request_email(topic, context, today_date, cache_key)
+        )
+    
+    async def request_email(self, topic: str, context: str, today_date: str, cache_key: str) -> str:
+        call = self.metrics.start("generate_email", self.model, topic)
+        with self.tracer.span("llm.generate_email", model=self.model) as span:
+            try:
+                completion = await self.backend.complete(
+                    self.build_email_messages(topic, context, today_date),
+                    self.temperature,
+                    self.build_response_format()
+                )
+                call.set_usage(completion.usage)
+                content = completion.content
+            except asyncio.CancelledError as e:
+                call.finish(e)
+                raise
+            except Exception as e:
+                call.finish(e)
+                raise LLMError(f"Failed to generate email: {e}", type(e).__name__) from e
+            
+            email_content, call.parse_outcome = self.parse_email_content(content)
+            call.finish()
+            span.set(prompt_tokens=call.prompt_tokens, completion_tokens=call.completion_tokens, parse_outcome=call.parse_outcome)
+        if call.parse_outcome != "failed":
+            await self.draft_cache.set(cache_key, email_content)
+        return email_content
+    
+    async def generate_email_batch(self, drafts: List[Dict[str, Any]]) -> AsyncIterator[Tuple[int, Optional[str], Optional[Exception]]]:
+        async def generate(index: int, draft: Dict[str, Any]) -> Tuple[int, Optional[str], Optional[Exception]]:
+            try:
+                email_content = await self.generate_email(draft["topic"], draft.get("context", ""), bypass_cache=draft.get("regenerate", False))
+                return index, email_content, None
+            except Exception as e:
+                return index, None, e
+        
+        results = bounded_as_completed((generate(index, draft) for index, draft in enumerate(drafts)), self.batch_concurrency)
+        try:
+            async for result in results:
+                yield result
+        finally:
+            await results.aclose()
+    
+    async def stream_email(self, topic: str, context: str = "", bypass_cache: bool = False) -> AsyncIterator[Dict[str, Any]]:
+        from datetime import datetime
+        today_date = datetime.now().strftime("%B %d, %Y")
+        
+        cache_key = draft_cache_key(topic, context, today_date, self.model, self.temperature)
+        if bypass_cache:
+            self.draft_cache.record_bypass()
+        else:
+            cached = await self.draft_cache.get(cache_key)
+            if cached is not None:
+                yield {"event": "draft", "email_draft": cached}
+                return
+        
+        events = self.single_flight.stream(
+            ("stream", cache_key, bypass_cache),
+            lambda: self.request_email_stream(topic, context, today_date, cache_key)
+        )
+        try:
+            async for event in events:
+                yield event
+        finally:
+            await events.aclose()
+    
+    async def request_email_stream(self, topic: str, context: str, today_date: str, cache_key: str) -> AsyncIterator[Dict[str, Any]]:
+        parser = PartialEmailParser()
+        chunks = []
+        call = self.metrics.start("stream_email", self.model, topic)
+        with self.tracer.detached_span("llm.stream_email", model=self.model) as span:
+            try:
+                async for chunk in self.backend.stream(
+                    self.build_email_messages(topic, context, today_date),
+                    self.temperature,
+                    self.build_response_format()
+                ):
+                    call.set_usage(chunk.usage)
+                    if not chunk.text:
+                        continue
+                    call.mark_first_token()
+                    chunks.append(chunk.text)
+                    for field, delta in parser.feed(chunk.text):
+                        yield {"event": "delta", "field": field, "text": delta}
+            except (asyncio.CancelledError, GeneratorExit) as e:
+                call.finish(e)
+                raise
+            except Exception as e:
+                call.finish(e)
+                raise LLMError(f"Failed to generate email: {e}", type(e).__name__) from e
+            
+            email_content, call.parse_outcome = self.parse_email_content("".join(chunks) if chunks else None)
+            call.finish()
+            span.set(ttft_ms=call.ttft_ms, prompt_tokens=call.prompt_tokens, completion_tokens=call.completion_tokens, parse_outcome=call.parse_outcome)
+        if call.parse_outcome != "failed":
+            await self.draft_cache.set(cache_key, email_content)
+        yield {"event": "draft", "email_draft": email_content}
+    
+    def build_email_messages(self, topic: str, context: str, today_date: str) -> List[Dict[str, str]]:
         prompt = f"""
         You are a professional email assistant for the CEO of TechFlow Solutions. Generate a professional, well-structured email about the following topic:
         
@@ -35,57 +166,31 @@ class LLMService:
         - Clear and concise with specific actionable information
         - Include proper subject line
         
-        CRITICAL: You MUST respond with ONLY valid JSON. Use proper JSON escaping for newlines.
+        CRITICAL: You MUST respond with ONLY a JSON object matching this schema:
+        {json.dumps(EMAIL_SCHEMA)}
         For line breaks in the email body, use \\n (escaped newline characters).
-        
-        Format your response exactly like this:
-        {{"subject": "Your subject here", "body": "Your email body here with \\n for line breaks"}}
         """
         
-        try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are a professional email writing assistant for corporate communications. Always respond with ONLY valid JSON containing 'subject' and 'body' fields. Use \\n for line breaks in the body. Example: {\"subject\": \"Subject Here\", \"body\": \"Body text here\\nWith line breaks\"}"},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3
-            )
-            content = response.choices[0].message.content
-            
-            if content is None:
-                return '{"subject": "", "body": ""}'
-            
-            import re
-            import json
-            json_match = re.search(r'\{.*\}', content, re.DOTALL)
-            if json_match:
-                json_content = json_match.group(0)
-                try:
-                    fixed_content = json_content.replace('\\n', '\n').replace('\\r', '\r').replace('\\t', '\t')
-                    parsed = json.loads(fixed_content)
-                    return json.dumps(parsed, ensure_ascii=False)
-                except json.JSONDecodeError:
-                    return json_content
-            
-            def escape_json_string(s):
-                return (s.replace('\\', '\\\\')
-                        .replace('"', '\\"')
-                        .replace('\n', '\\n')
-                        .replace('\r', '\\r')
-                        .replace('\t', '\\t')
-                        .replace('\b', '\\b')
-                        .replace('\f', '\\f'))
-            
-            escaped_content = escape_json_string(content)
-            return f'{{"subject": "Company Communication", "body": "{escaped_content}"}}'
-            
-        except Exception as e:
-            raise Exception(f"Failed to generate email: {e}")
+        return [
+            {"role": "system", "content": "You are a professional email writing assistant for corporate communications. Always respond with ONLY valid JSON containing 'subject' and 'body' fields. Use \\n for line breaks in the body. Example: {\"subject\": \"Subject Here\", \"body\": \"Body text here\\nWith line breaks\"}"},
+            {"role": "user", "content": prompt}
+        ]
     
-    async def generate_response_with_tools(self, messages: List[BaseMessage], employee_emails: List[str] = None) -> AIMessage:
+    def parse_email_content(self, content: Optional[str]) -> Tuple[str, str]:
+        email, outcome = parse_email_json(content)
+        self.parse_stats.record(outcome)
+        return json.dumps(email, ensure_ascii=False), outcome
+    
+    def build_response_format(self) -> Dict[str, Any]:
+        if self.response_format == "json_schema":
+            return {"type": "json_schema", "json_schema": {"name": "email_draft", "schema": EMAIL_SCHEMA}}
+        return {"type": "json_object"}
+    
+    async def generate_response_with_tools(self, messages: List[BaseMessage], employee_emails: List[str] = None, pending_email: Dict[str, str] = None) -> AIMessage:
         if employee_emails is None:
             employee_emails = []
+        if pending_email is None:
+            pending_email = {}
         
         last_user_message = ""
         for msg in reversed(messages):
@@ -93,17 +198,19 @@ class LLMService:
                 last_user_message = msg.content
                 break
         
-        if any(phrase in last_user_message.lower() for phrase in 
-               ["generate email", "write email", "create email", "email about", "write an email", "make email",
-                "compose email", "draft email", "email on", "create a", "write a", "send a", "make a",
-                "announcement", "meeting", "holiday", "greeting", "update", "invite", "inform", "notify"]):
-            
-            topic = self._extract_topic_from_message(last_user_message)
-            
+        route = intent_router.route(last_user_message)
+        
+        if route.intent == "regenerate" and not draft_topic(pending_email):
+            return AIMessage(
+                content="There is no draft to improve yet. Ask me to write an email first, then say 'enhance it'."
+            )
+        
+        if route.intent in ("generate", "regenerate"):
+            topic = route.topic if route.intent == "generate" else draft_topic(pending_email)
             tool_calls = [
                 ToolCall(
                     name="generate_professional_email",
-                    args={"topic": topic, "context": ""},
+                    args={"topic": topic, "context": "", "regenerate": route.regenerate},
                     id="generate_email_call"
                 )
             ]
@@ -113,8 +220,12 @@ class LLMService:
                 tool_calls=tool_calls
             )
             
-        elif any(phrase in last_user_message.lower() for phrase in 
-                ["send email", "send it", "send the email"]):
+        elif route.intent == "send":
+            
+            if not pending_email.get("subject") or not pending_email.get("body"):
+                return AIMessage(
+                    content="There is no draft to send yet. Ask me to write an email first, then say 'send it'."
+                )
             
             return AIMessage(
                 content="I'll send the email to all employees now.",
@@ -123,60 +234,15 @@ class LLMService:
                         name="send_email_to_employees",
                         args={
                             "employee_emails": employee_emails,
-                            "subject": "Email Subject",
-                            "email_body": "Email Body"
+                            "subject": pending_email["subject"],
+                            "email_body": pending_email["body"]
                         },
                         id="send_email_call"
                     )
                 ]
             )
         else:
-            return AIMessage(
-                content="I am an email agent specialized in writing and sending professional emails. I can help you:\n\n• Generate professional emails for company communications\n• Write emails about meetings, announcements, holidays, etc.\n• Send emails to your employees\n\nPlease ask me to write or send an email, and I'll be happy to help!"
-            )
+            return AIMessage(content=HELP_TEXT)
     
     def extract_topic_from_message(self, message: str) -> str:
-        message_lower = message.lower()
-        
-        patterns = [
-            "write an email about", "write email about", "email about",
-            "write an email on", "write email on", "email on",
-            "create email about", "create email on",
-            "make email about", "make email on",
-            "compose email about", "compose email on",
-            "draft email about", "draft email on",
-            "generate email about", "generate email on"
-        ]
-        
-        for pattern in patterns:
-            if pattern in message_lower:
-                topic = message_lower.split(pattern)[-1].strip()
-                if topic:  
-                    return topic
-        
-        fallback_patterns = ["write email", "create email", "make email", "compose email", "draft email", "generate email"]
-        for pattern in fallback_patterns:
-            if pattern in message_lower:
-                topic = message_lower.split(pattern)[-1].strip()
-                if topic:
-                    return topic
-        
-        natural_patterns = [
-            "create a", "write a", "send a", "make a", "make an", "create an", "write an"
-        ]
-        
-        for pattern in natural_patterns:
-            if pattern in message_lower:
-                topic = message_lower.split(pattern)[-1].strip()
-                if topic:
-                    return topic
-        
-        if "announce" in message_lower:
-            if "announce that" in message_lower:
-                topic = message_lower.split("announce that")[-1].strip()
-            else:
-                topic = message_lower.split("announce")[-1].strip()
-            if topic:
-                return topic
-        
-        return message_lower if message_lower else "General company communication"
+        return intent_router.extract_topic(message)[0]
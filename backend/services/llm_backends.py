@@ -0,0 +1,147 @@
+import os
+import re
+import json
+import random
+import asyncio
+import httpx
+from abc import ABC, abstractmethod
+from dotenv import load_dotenv
+from groq import AsyncGroq
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+load_dotenv()
+
+DEFAULT_MODEL = "llama-3.1-8b-instant"
+
+class LLMUsage:
+    def __init__(self, prompt_tokens: int, completion_tokens: int):
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        self.total_tokens = prompt_tokens + completion_tokens
+
+class LLMCompletion:
+    def __init__(self, content: Optional[str], usage: Optional[Any] = None):
+        self.content = content
+        self.usage = usage
+
+class LLMChunk:
+    def __init__(self, text: Optional[str] = None, usage: Optional[Any] = None):
+        self.text = text
+        self.usage = usage
+
+class LLMBackend(ABC):
+    model = DEFAULT_MODEL
+
+    @abstractmethod
+    async def complete(self, messages: List[Dict[str, str]], temperature: float, response_format: Dict[str, Any]) -> LLMCompletion:
+        raise NotImplementedError
+
+    @abstractmethod
+    def stream(self, messages: List[Dict[str, str]], temperature: float, response_format: Dict[str, Any]) -> AsyncIterator[LLMChunk]:
+        raise NotImplementedError
+
+    async def aclose(self) -> None:
+        pass
+
+class GroqBackend(LLMBackend):
+    def __init__(self, api_key: str = None, model: str = None):
+        self.api_key = api_key or os.environ.get("GROQ_API_KEY")
+        if not self.api_key:
+            raise ValueError("GROQ_API_KEY environment variable must be set")
+        self.model = model or os.environ.get("LLM_MODEL", DEFAULT_MODEL)
+        self.timeout = float(os.environ.get("GROQ_TIMEOUT", "60"))
+        self.connect_timeout = float(os.environ.get("GROQ_CONNECT_TIMEOUT", "5"))
+        self.max_connections = int(os.environ.get("GROQ_MAX_CONNECTIONS", "50"))
+        self.http_client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections),
+            timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout)
+        )
+        self.client = AsyncGroq(
+            api_key=self.api_key,
+            timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+            max_retries=int(os.environ.get("GROQ_MAX_RETRIES", "2")),
+            http_client=self.http_client
+        )
+
+    async def complete(self, messages: List[Dict[str, str]], temperature: float, response_format: Dict[str, Any]) -> LLMCompletion:
+        response = await self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=temperature,
+            response_format=response_format
+        )
+        return LLMCompletion(response.choices[0].message.content, response.usage)
+
+    async def stream(self, messages: List[Dict[str, str]], temperature: float, response_format: Dict[str, Any]) -> AsyncIterator[LLMChunk]:
+        stream = await self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=temperature,
+            response_format=response_format,
+            stream=True
+        )
+        async for chunk in stream:
+            x_groq = getattr(chunk, "x_groq", None)
+            usage = chunk.usage or getattr(x_groq, "usage", None)
+            text = chunk.choices[0].delta.content if chunk.choices else None
+            if text or usage is not None:
+                yield LLMChunk(text, usage)
+
+    async def aclose(self) -> None:
+        await self.client.close()
+
+class StubBackend(LLMBackend):
+    def __init__(self, model: str = None, latency_ms: float = None, jitter_ms: float = None, tokens_per_second: float = None, malformed_rate: float = None, seed: int = None):
+        self.model = model or os.environ.get("LLM_MODEL", DEFAULT_MODEL)
+        self.latency_ms = latency_ms if latency_ms is not None else float(os.environ.get("LLM_STUB_LATENCY_MS", "300"))
+        self.jitter_ms = jitter_ms if jitter_ms is not None else float(os.environ.get("LLM_STUB_JITTER_MS", "0"))
+        self.tokens_per_second = tokens_per_second if tokens_per_second is not None else float(os.environ.get("LLM_STUB_TOKENS_PER_SECOND", "500"))
+        self.malformed_rate = malformed_rate if malformed_rate is not None else float(os.environ.get("LLM_STUB_MALFORMED_RATE", "0"))
+        self.random = random.Random(seed if seed is not None else int(os.environ.get("LLM_STUB_SEED", "0")))
+
+    async def complete(self, messages: List[Dict[str, str]], temperature: float, response_format: Dict[str, Any]) -> LLMCompletion:
+        content, usage, first_token_delay = self.render(messages)
+        await asyncio.sleep(first_token_delay + self.token_delay() * usage.completion_tokens)
+        return LLMCompletion(content, usage)
+
+    async def stream(self, messages: List[Dict[str, str]], temperature: float, response_format: Dict[str, Any]) -> AsyncIterator[LLMChunk]:
+        content, usage, first_token_delay = self.render(messages)
+        await asyncio.sleep(first_token_delay)
+        for index in range(0, len(content), 4):
+            yield LLMChunk(content[index:index + 4])
+            await asyncio.sleep(self.token_delay())
+        yield LLMChunk(usage=usage)
+
+    def render(self, messages: List[Dict[str, str]]) -> tuple:
+        prompt = " ".join(message.get("content", "") for message in messages)
+        match = re.search(r"Topic:\s*(.+)", prompt)
+        topic = match.group(1).strip() if match else "Company update"
+        email = {
+            "subject": topic[:1].upper() + topic[1:80],
+            "body": f"Dear Team,\n\nThis note is about {topic}.\n\nPlease reach out with any questions.\n\nBest regards,\nCEO\nTechFlow"
+        }
+        content = json.dumps(email)
+
+        if self.random.random() < self.malformed_rate:
+            style = self.random.choice(("prose", "truncated", "text"))
+            if style == "prose":
+                content = f"Sure! Here is the email you asked for:\n{content}\nLet me know if you need changes."
+            elif style == "truncated":
+                content = content[:int(len(content) * 0.7)]
+            else:
+                content = email["body"]
+
+        first_token_delay = (self.latency_ms + self.random.uniform(0, self.jitter_ms)) / 1000
+        usage = LLMUsage(max(1, len(prompt) // 4), max(1, len(content) // 4))
+        return content, usage, first_token_delay
+
+    def token_delay(self) -> float:
+        return 1 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+
+def create_llm_backend(kind: str = None) -> LLMBackend:
+    kind = (kind or os.environ.get("LLM_BACKEND", "groq")).lower()
+    if kind == "groq":
+        return GroqBackend()
+    if kind == "stub":
+        return StubBackend()
+    raise ValueError(f"Unknown LLM_BACKEND: {kind}")
@@ -0,0 +1,186 @@
+import os
+import time
+from collections import deque
+from dotenv import load_dotenv
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+load_dotenv()
+
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192)
+
+class Histogram:
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def observe(self, value: float) -> None:
+        index = 0
+        while index < len(self.bounds) and value > self.bounds[index]:
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank and bucket_count:
+                return min(self.bounds[index], self.max) if index < len(self.bounds) else self.max
+        return self.max
+
+    def snapshot(self) -> Dict[str, Any]:
+        cumulative = 0
+        buckets = {}
+        for bound, bucket_count in zip(self.bounds, self.counts):
+            cumulative += bucket_count
+            buckets[str(bound)] = cumulative
+        buckets["+Inf"] = self.count
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min,
+            "max": self.max,
+            "mean": self.sum / self.count if self.count else None,
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "p99": self.quantile(0.99),
+            "buckets": buckets
+        }
+
+class LLMCall:
+    def __init__(self, metrics: "LLMMetrics", operation: str, model: str, prompt: str):
+        self.metrics = metrics
+        self.operation = operation
+        self.model = model
+        self.prompt = prompt
+        self.started = time.perf_counter()
+        self.ttft_ms: Optional[float] = None
+        self.prompt_tokens: Optional[int] = None
+        self.completion_tokens: Optional[int] = None
+        self.parse_outcome: Optional[str] = None
+        self.finished = False
+
+    def mark_first_token(self) -> None:
+        if self.ttft_ms is None:
+            self.ttft_ms = (time.perf_counter() - self.started) * 1000
+
+    def set_usage(self, usage: Any) -> None:
+        if usage is not None:
+            self.prompt_tokens = getattr(usage, "prompt_tokens", None)
+            self.completion_tokens = getattr(usage, "completion_tokens", None)
+
+    def finish(self, error: BaseException = None) -> None:
+        if self.finished:
+            return
+        self.finished = True
+        self.metrics.record(self, (time.perf_counter() - self.started) * 1000, type(error).__name__ if error is not None else None)
+
+class LLMMetrics:
+    def __init__(self, recent_size: int = None):
+        self.recent_size = recent_size if recent_size is not None else int(os.environ.get("LLM_METRICS_RECENT", "200"))
+        self.series: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self.recent: deque = deque(maxlen=max(1, self.recent_size))
+
+    def start(self, operation: str, model: str, prompt: str = "") -> LLMCall:
+        return LLMCall(self, operation, model, prompt)
+
+    def record(self, call: LLMCall, wall_ms: float, error_class: Optional[str]) -> None:
+        series = self.series.get((call.operation, call.model))
+        if series is None:
+            series = {
+                "calls": 0,
+                "errors": {},
+                "parse_outcomes": {},
+                "wall_ms": Histogram(LATENCY_BUCKETS_MS),
+                "ttft_ms": Histogram(LATENCY_BUCKETS_MS),
+                "prompt_tokens": Histogram(TOKEN_BUCKETS),
+                "completion_tokens": Histogram(TOKEN_BUCKETS)
+            }
+            self.series[(call.operation, call.model)] = series
+
+        series["calls"] += 1
+        series["wall_ms"].observe(wall_ms)
+        if call.ttft_ms is not None:
+            series["ttft_ms"].observe(call.ttft_ms)
+        if call.prompt_tokens is not None:
+            series["prompt_tokens"].observe(call.prompt_tokens)
+        if call.completion_tokens is not None:
+            series["completion_tokens"].observe(call.completion_tokens)
+        if call.parse_outcome:
+            series["parse_outcomes"][call.parse_outcome] = series["parse_outcomes"].get(call.parse_outcome, 0) + 1
+        if error_class:
+            series["errors"][error_class] = series["errors"].get(error_class, 0) + 1
+
+        self.recent.append({
+            "operation": call.operation,
+            "model": call.model,
+            "prompt": call.prompt[:120],
+            "wall_ms": round(wall_ms, 3),
+            "ttft_ms": round(call.ttft_ms, 3) if call.ttft_ms is not None else None,
+            "prompt_tokens": call.prompt_tokens,
+            "completion_tokens": call.completion_tokens,
+            "parse_outcome": call.parse_outcome,
+            "error": error_class,
+            "finished_at": time.time()
+        })
+
+    def slowest(self, limit: int = 10) -> List[Dict[str, Any]]:
+        return sorted(self.recent, key=lambda call: call["wall_ms"], reverse=True)[:limit]
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "series": [
+                {
+                    "operation": operation,
+                    "model": model,
+                    "calls": series["calls"],
+                    "errors": dict(series["errors"]),
+                    "parse_outcomes": dict(series["parse_outcomes"]),
+                    "wall_ms": series["wall_ms"].snapshot(),
+                    "ttft_ms": series["ttft_ms"].snapshot(),
+                    "prompt_tokens": series["prompt_tokens"].snapshot(),
+                    "completion_tokens": series["completion_tokens"].snapshot()
+                }
+                for (operation, model), series in self.series.items()
+            ],
+            "slowest": self.slowest()
+        }
+
+    def export_prometheus(self) -> str:
+        lines = []
+        for (operation, model), series in self.series.items():
+            labels = f'operation="{operation}",model="{model}"'
+            lines.append(f"llm_calls_total{{{labels}}} {series['calls']}")
+            for error_class, count in series["errors"].items():
+                lines.append(f'llm_errors_total{{{labels},error="{error_class}"}} {count}')
+            for outcome, count in series["parse_outcomes"].items():
+                lines.append(f'llm_parse_outcomes_total{{{labels},outcome="{outcome}"}} {count}')
+            for name in ("wall_ms", "ttft_ms", "prompt_tokens", "completion_tokens"):
+                histogram = series[name]
+                cumulative = 0
+                for bound, bucket_count in zip(histogram.bounds, histogram.counts):
+                    cumulative += bucket_count
+                    lines.append(f'llm_{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'llm_{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                lines.append(f"llm_{name}_sum{{{labels}}} {histogram.sum}")
+                lines.append(f"llm_{name}_count{{{labels}}} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+shared_metrics: Optional[LLMMetrics] = None
+
+def get_shared_llm_metrics() -> LLMMetrics:
+    global shared_metrics
+    if shared_metrics is None:
+        shared_metrics = LLMMetrics()
+    return shared_metrics
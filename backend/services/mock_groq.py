@@ -0,0 +1,86 @@
+import os
+import asyncio
+import json
+import random
+import time
+import uuid
+from fastapi import FastAPI, Request, Header
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import Optional, Dict, Any
+
+app = FastAPI(title="Groq stand-in")
+app.state.requests = 0
+app.state.config = {
+    "latency_ms": float(os.environ.get("MOCK_GROQ_LATENCY_MS", "300")),
+    "jitter_ms": float(os.environ.get("MOCK_GROQ_JITTER_MS", "0")),
+    "token_delay_ms": float(os.environ.get("MOCK_GROQ_TOKEN_DELAY_MS", "5")),
+}
+
+def configure(**overrides: Any) -> Dict[str, Any]:
+    for key, value in overrides.items():
+        if key not in app.state.config:
+            raise ValueError(f"Unknown stand-in setting: {key}")
+        if value is not None:
+            app.state.config[key] = type(app.state.config[key])(value)
+    return dict(app.state.config)
+
+@app.post("/openai/v1/chat/completions")
+async def chat_completions(request: Request, authorization: Optional[str] = Header(None)):
+    if not authorization or not authorization.startswith("Bearer "):
+        return JSONResponse(status_code=401, content={"error": {"message": "Invalid API Key", "type": "invalid_request_error"}})
+
+    payload = await request.json()
+    config = app.state.config
+    latency = config["latency_ms"] + random.uniform(0, config["jitter_ms"])
+    if latency > 0:
+        await asyncio.sleep(latency / 1000)
+
+    app.state.requests += 1
+    prompt = " ".join(str(message.get("content", "")) for message in payload.get("messages", []))
+    content = json.dumps({
+        "subject": "Company Update",
+        "body": "Dear Team,\n\nThis is a generated message from the local Groq stand-in.\n\nBest regards,\nCEO\nTechFlow"
+    })
+    prompt_tokens = max(1, len(prompt) // 4)
+    completion_tokens = max(1, len(content) // 4)
+    model = payload.get("model", "llama-3.1-8b-instant")
+    usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens}
+    if payload.get("stream"):
+        return StreamingResponse(stream_completion(content, model, config["token_delay_ms"], usage), media_type="text/event-stream")
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": usage
+    }
+
+async def stream_completion(content: str, model: str, token_delay_ms: float, usage: Dict[str, int]):
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+    created = int(time.time())
+    for index in range(0, len(content), 4):
+        chunk = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "delta": {"content": content[index:index + 4]}, "finish_reason": None}]
+        }
+        yield f"data: {json.dumps(chunk)}\n\n"
+        if token_delay_ms > 0:
+            await asyncio.sleep(token_delay_ms / 1000)
+    final = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": created,
+        "model": model,
+        "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+        "x_groq": {"id": completion_id, "usage": usage}
+    }
+    yield f"data: {json.dumps(final)}\n\n"
+    yield "data: [DONE]\n\n"
+
+@app.get("/stats")
+async def stats():
+    return {"requests": app.state.requests, "config": app.state.config}
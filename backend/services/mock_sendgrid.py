@@ -0,0 +1,85 @@
+import os
+import asyncio
+import random
+from fastapi import FastAPI, Request, Header
+from fastapi.responses import JSONResponse, Response
+from typing import Optional, Dict, Any
+
+app = FastAPI(title="SendGrid stand-in")
+app.state.requests = 0
+app.state.recipients = 0
+app.state.throttled = 0
+app.state.server_errors = 0
+app.state.config = {
+    "latency_ms": float(os.environ.get("MOCK_SENDGRID_LATENCY_MS", "0")),
+    "jitter_ms": float(os.environ.get("MOCK_SENDGRID_JITTER_MS", "0")),
+    "rate_429": float(os.environ.get("MOCK_SENDGRID_429_RATE", "0")),
+    "rate_5xx": float(os.environ.get("MOCK_SENDGRID_5XX_RATE", "0")),
+    "retry_after": float(os.environ.get("MOCK_SENDGRID_RETRY_AFTER", "1")),
+    "max_personalizations": int(os.environ.get("MOCK_SENDGRID_MAX_PERSONALIZATIONS", "1000")),
+}
+
+def configure(**overrides: Any) -> Dict[str, Any]:
+    for key, value in overrides.items():
+        if key not in app.state.config:
+            raise ValueError(f"Unknown stand-in setting: {key}")
+        if value is not None:
+            app.state.config[key] = type(app.state.config[key])(value)
+    return dict(app.state.config)
+
+def reset_stats() -> None:
+    app.state.requests = 0
+    app.state.recipients = 0
+    app.state.throttled = 0
+    app.state.server_errors = 0
+
+@app.post("/v3/mail/send")
+async def mail_send(request: Request, authorization: Optional[str] = Header(None)) -> Response:
+    config = app.state.config
+    if not authorization or not authorization.startswith("Bearer "):
+        return JSONResponse(status_code=401, content={"errors": [{"message": "authorization required"}]})
+
+    payload = await request.json()
+    personalizations = payload.get("personalizations") or []
+    if not personalizations:
+        return JSONResponse(status_code=400, content={"errors": [{"message": "personalizations required", "field": "personalizations"}]})
+    if len(personalizations) > config["max_personalizations"]:
+        return JSONResponse(status_code=400, content={"errors": [{"message": f"personalizations must contain at most {config['max_personalizations']} items", "field": "personalizations"}]})
+
+    latency = config["latency_ms"] + random.uniform(0, config["jitter_ms"])
+    if latency > 0:
+        await asyncio.sleep(latency / 1000)
+
+    app.state.requests += 1
+    roll = random.random()
+    if roll < config["rate_429"]:
+        app.state.throttled += 1
+        return JSONResponse(status_code=429, content={"errors": [{"message": "too many requests"}]}, headers={"Retry-After": f"{config['retry_after']:g}"})
+    if roll < config["rate_429"] + config["rate_5xx"]:
+        app.state.server_errors += 1
+        return JSONResponse(status_code=503, content={"errors": [{"message": "service unavailable"}]})
+
+    app.state.recipients += sum(len(p.get("to", [])) for p in personalizations)
+    return Response(status_code=202)
+
+@app.get("/stats")
+async def stats():
+    return {
+        "requests": app.state.requests,
+        "recipients": app.state.recipients,
+        "throttled": app.state.throttled,
+        "server_errors": app.state.server_errors,
+        "config": app.state.config
+    }
+
+@app.post("/config")
+async def update_config(overrides: Dict[str, Any]):
+    try:
+        return configure(**overrides)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"errors": [{"message": str(e)}]})
+
+@app.post("/reset")
+async def reset():
+    reset_stats()
+    return {"requests": 0, "recipients": 0}
@@ -0,0 +1,140 @@
+import json
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+EMAIL_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "subject": {"type": "string", "description": "Email subject line"},
+        "body": {"type": "string", "description": "Email body, using \\n for line breaks"}
+    },
+    "required": ["subject", "body"],
+    "additionalProperties": False
+}
+
+decoder = json.JSONDecoder(strict=False)
+
+ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+class PartialEmailParser:
+    def __init__(self, fields: Tuple[str, ...] = ("subject", "body")):
+        self.fields = fields
+        self.values: Dict[str, str] = {field: "" for field in fields}
+        self.state = "seek_key"
+        self.key = ""
+        self.current: Optional[str] = None
+        self.escape = ""
+
+    def feed(self, text: str) -> List[Tuple[str, str]]:
+        deltas: List[Tuple[str, str]] = []
+        pending = ""
+        for char in text:
+            if self.state == "seek_key":
+                if char == '"':
+                    self.state = "key"
+                    self.key = ""
+            elif self.state == "key":
+                if char == '"':
+                    self.state = "seek_colon"
+                else:
+                    self.key += char
+            elif self.state == "seek_colon":
+                if char == ":":
+                    self.state = "seek_value"
+                elif not char.isspace():
+                    self.state = "seek_key"
+            elif self.state == "seek_value":
+                if char == '"':
+                    self.current = self.key if self.key in self.fields else None
+                    self.state = "value"
+                elif not char.isspace():
+                    self.state = "seek_key"
+            elif self.state == "value":
+                if self.escape:
+                    self.escape += char
+                    decoded = self.decode_escape()
+                    if decoded is None:
+                        continue
+                    pending += decoded
+                elif char == "\\":
+                    self.escape = "\\"
+                elif char == '"':
+                    if self.current and pending:
+                        deltas.append((self.current, pending))
+                        self.values[self.current] += pending
+                    pending = ""
+                    self.current = None
+                    self.state = "seek_key"
+                else:
+                    pending += char
+        if self.state == "value" and self.current and pending:
+            deltas.append((self.current, pending))
+            self.values[self.current] += pending
+        return deltas
+
+    def decode_escape(self) -> Optional[str]:
+        sequence = self.escape
+        if len(sequence) == 2 and sequence[1] != "u":
+            self.escape = ""
+            return ESCAPES.get(sequence[1], sequence[1])
+        if sequence[1] == "u" and len(sequence) == 6:
+            self.escape = ""
+            try:
+                return chr(int(sequence[2:], 16))
+            except ValueError:
+                return ""
+        return None
+
+def parse_email_json(content: Optional[str]) -> Tuple[Dict[str, str], str]:
+    if content is None or not content.strip():
+        return {"subject": "", "body": ""}, "failed"
+
+    text = content.strip()
+    start = text.find("{")
+    if start != -1:
+        try:
+            parsed, _ = decoder.raw_decode(text, start)
+        except json.JSONDecodeError:
+            parsed = None
+        if is_valid_email(parsed):
+            outcome = "ok" if start == 0 else "repaired"
+            return {"subject": parsed["subject"], "body": parsed["body"]}, outcome
+
+    parser = PartialEmailParser()
+    parser.feed(text)
+    if parser.values["body"]:
+        return {"subject": parser.values["subject"] or "Company Communication", "body": parser.values["body"]}, "repaired"
+
+    return {"subject": "Company Communication", "body": text}, "failed"
+
+def is_valid_email(parsed: Any) -> bool:
+    return (
+        isinstance(parsed, dict)
+        and isinstance(parsed.get("subject"), str)
+        and isinstance(parsed.get("body"), str)
+        and bool(parsed["body"].strip())
+    )
+
+class ParseStats:
+    def __init__(self):
+        self.counts = Counter()
+
+    def record(self, outcome: str) -> None:
+        self.counts[outcome] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        total = sum(self.counts.values())
+        return {
+            "ok": self.counts["ok"],
+            "repaired": self.counts["repaired"],
+            "failed": self.counts["failed"],
+            "failure_rate": self.counts["failed"] / total if total else 0.0
+        }
+
+shared_parse_stats: Optional[ParseStats] = None
+
+def get_shared_parse_stats() -> ParseStats:
+    global shared_parse_stats
+    if shared_parse_stats is None:
+        shared_parse_stats = ParseStats()
+    return shared_parse_stats
@@ -0,0 +1,259 @@
+import os
+import asyncio
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from dotenv import load_dotenv
+from typing import List, Dict, Any, Optional, Callable, Awaitable
+from .sendgrid import EmailService, normalize_recipients
+from .tracing import Tracer, get_shared_tracer
+from .state import connect_sqlite
+
+load_dotenv()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS send_jobs (
+    id TEXT PRIMARY KEY,
+    subject TEXT NOT NULL,
+    body TEXT NOT NULL,
+    status TEXT NOT NULL,
+    total_count INTEGER NOT NULL,
+    sent_count INTEGER NOT NULL DEFAULT 0,
+    failed_count INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    claimed_by TEXT,
+    claimed_at REAL
+);
+CREATE TABLE IF NOT EXISTS send_job_recipients (
+    job_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    email TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    status_code INTEGER,
+    PRIMARY KEY (job_id, position)
+);
+CREATE INDEX IF NOT EXISTS idx_send_job_recipients_status ON send_job_recipients (job_id, status, position);
+CREATE INDEX IF NOT EXISTS idx_send_job_recipients_email ON send_job_recipients (job_id, email);
+CREATE INDEX IF NOT EXISTS idx_send_jobs_status ON send_jobs (status);
+"""
+
+class SendQueue:
+    def __init__(self, email_service: EmailService, on_complete: Callable[[Dict[str, Any]], Awaitable[None]] = None, db_path: str = None, workers: int = None, tracer: Tracer = None):
+        data_dir = os.environ.get("CORPMAIL_DATA_DIR", "data")
+        self.db_path = db_path or os.environ.get("SEND_QUEUE_DB", os.path.join(data_dir, "send_queue.db"))
+        self.worker_count = workers if workers is not None else int(os.environ.get("SEND_QUEUE_WORKERS", "2"))
+        self.lease_seconds = float(os.environ.get("SEND_QUEUE_LEASE_SECONDS", "60"))
+        self.owner = uuid.uuid4().hex
+        self.active: set = set()
+        self.email_service = email_service
+        self.on_complete = on_complete
+        self.tracer = tracer or get_shared_tracer()
+        self.lock = threading.Lock()
+        self.pending: Optional[asyncio.Queue] = None
+        self.workers: List[asyncio.Task] = []
+
+        self.connection = connect_sqlite(self.db_path)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.executescript(SCHEMA)
+        self.migrate()
+        self.connection.commit()
+
+    def migrate(self) -> None:
+        columns = {row["name"] for row in self.connection.execute("PRAGMA table_info(send_job_recipients)")}
+        if "attempts" not in columns:
+            self.connection.execute("ALTER TABLE send_job_recipients ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+        if "status_code" not in columns:
+            self.connection.execute("ALTER TABLE send_job_recipients ADD COLUMN status_code INTEGER")
+        columns = {row["name"] for row in self.connection.execute("PRAGMA table_info(send_jobs)")}
+        if "claimed_by" not in columns:
+            self.connection.execute("ALTER TABLE send_jobs ADD COLUMN claimed_by TEXT")
+        if "claimed_at" not in columns:
+            self.connection.execute("ALTER TABLE send_jobs ADD COLUMN claimed_at REAL")
+
+    async def start(self) -> None:
+        if self.workers:
+            return
+        self.pending = asyncio.Queue()
+        await self.schedule_unclaimed()
+        self.workers = [asyncio.create_task(self.worker()) for _ in range(max(1, self.worker_count))]
+        self.workers.append(asyncio.create_task(self.reclaim_loop()))
+
+    async def stop(self) -> None:
+        workers, self.workers = self.workers, []
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        self.active.clear()
+        await asyncio.to_thread(self.release_claims)
+
+    async def enqueue(self, employee_emails: List[str], subject: str, body: str) -> Dict[str, Any]:
+        await self.start()
+        job_id = uuid.uuid4().hex
+        job = await asyncio.to_thread(self.insert_job, job_id, normalize_recipients(employee_emails), subject, body)
+        self.schedule(job_id)
+        return job
+
+    async def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self.load_job, job_id)
+
+    async def get_recipients(self, job_id: str) -> List[str]:
+        return await asyncio.to_thread(self.job_recipients, job_id)
+
+    async def worker(self) -> None:
+        while True:
+            job_id = await self.pending.get()
+            try:
+                with self.tracer.span("send_queue.job", job_id=job_id):
+                    await self.process_job(job_id)
+            except Exception:
+                await asyncio.to_thread(self.set_status, job_id, "failed")
+            finally:
+                self.active.discard(job_id)
+                self.pending.task_done()
+
+    def schedule(self, job_id: str) -> None:
+        if job_id not in self.active:
+            self.active.add(job_id)
+            self.pending.put_nowait(job_id)
+
+    async def schedule_unclaimed(self) -> None:
+        for job_id in await asyncio.to_thread(self.unfinished_job_ids):
+            self.schedule(job_id)
+
+    async def reclaim_loop(self) -> None:
+        while True:
+            await asyncio.sleep(max(1.0, self.lease_seconds / 2))
+            await self.schedule_unclaimed()
+
+    async def renew_claim(self, job_id: str) -> None:
+        while True:
+            await asyncio.sleep(max(0.5, self.lease_seconds / 3))
+            await asyncio.to_thread(self.claim_job, job_id)
+
+    async def process_job(self, job_id: str) -> None:
+        job = await asyncio.to_thread(self.load_job, job_id)
+        if job is None or job["status"] in ("completed", "failed"):
+            return
+        if not await asyncio.to_thread(self.claim_job, job_id):
+            return
+        renewal = asyncio.create_task(self.renew_claim(job_id))
+        try:
+            await self.send_job(job_id, job)
+        finally:
+            renewal.cancel()
+
+    async def send_job(self, job_id: str, job: Dict[str, Any]) -> None:
+        await asyncio.to_thread(self.set_status, job_id, "running")
+
+        page_size = max(1, self.email_service.batch_size) * max(1, self.email_service.max_concurrency)
+        while True:
+            if not await asyncio.to_thread(self.claim_job, job_id):
+                return
+            page = await asyncio.to_thread(self.queued_recipients, job_id, page_size)
+            if not page:
+                break
+            with self.tracer.span("send_queue.page", recipients=len(page)):
+                chunks = self.email_service.stream_campaign(page, job["subject"], job["body"])
+                try:
+                    async for outcomes in chunks:
+                        await asyncio.to_thread(self.record_results, job_id, outcomes)
+                finally:
+                    await chunks.aclose()
+
+        job = await asyncio.to_thread(self.load_job, job_id)
+        status = "completed" if job["sent_count"] > 0 or job["total_count"] == 0 else "failed"
+        await asyncio.to_thread(self.set_status, job_id, status)
+        job["status"] = status
+        if self.on_complete:
+            await self.on_complete(job)
+
+    def insert_job(self, job_id: str, employee_emails: List[str], subject: str, body: str) -> Dict[str, Any]:
+        now = datetime.now().isoformat()
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT INTO send_jobs (id, subject, body, status, total_count, created_at, updated_at) VALUES (?, ?, ?, 'queued', ?, ?, ?)",
+                (job_id, subject, body, len(employee_emails), now, now)
+            )
+            self.connection.executemany(
+                "INSERT INTO send_job_recipients (job_id, position, email) VALUES (?, ?, ?)",
+                ((job_id, position, email) for position, email in enumerate(employee_emails))
+            )
+        return self.load_job(job_id)
+
+    def load_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            row = self.connection.execute("SELECT * FROM send_jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["job_id"] = job.pop("id")
+        job.pop("claimed_by", None)
+        job.pop("claimed_at", None)
+        job["queued_count"] = job["total_count"] - job["sent_count"] - job["failed_count"]
+        return job
+
+    def unfinished_job_ids(self) -> List[str]:
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT id FROM send_jobs WHERE status IN ('queued', 'running') AND (claimed_by IS NULL OR claimed_at < ?) ORDER BY created_at",
+                (time.time() - self.lease_seconds,)
+            ).fetchall()
+        return [row["id"] for row in rows]
+
+    def claim_job(self, job_id: str) -> bool:
+        now = time.time()
+        with self.lock, self.connection:
+            cursor = self.connection.execute(
+                "UPDATE send_jobs SET claimed_by = ?, claimed_at = ? WHERE id = ? AND status IN ('queued', 'running') AND (claimed_by IS NULL OR claimed_by = ? OR claimed_at < ?)",
+                (self.owner, now, job_id, self.owner, now - self.lease_seconds)
+            )
+        return cursor.rowcount == 1
+
+    def release_claims(self) -> None:
+        with self.lock, self.connection:
+            self.connection.execute(
+                "UPDATE send_jobs SET claimed_by = NULL, claimed_at = NULL WHERE claimed_by = ? AND status IN ('queued', 'running')",
+                (self.owner,)
+            )
+
+    def queued_recipients(self, job_id: str, limit: int) -> List[str]:
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT email FROM send_job_recipients WHERE job_id = ? AND status = 'queued' ORDER BY position LIMIT ?",
+                (job_id, limit)
+            ).fetchall()
+        return [row["email"] for row in rows]
+
+    def job_recipients(self, job_id: str) -> List[str]:
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT email FROM send_job_recipients WHERE job_id = ? ORDER BY position",
+                (job_id,)
+            ).fetchall()
+        return [row["email"] for row in rows]
+
+    def record_results(self, job_id: str, outcomes: Dict[str, Dict[str, Any]]) -> None:
+        sent_count = sum(1 for outcome in outcomes.values() if outcome["success"])
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "UPDATE send_job_recipients SET status = ?, attempts = ?, status_code = ? WHERE job_id = ? AND email = ? AND status = 'queued'",
+                (
+                    ("sent" if outcome["success"] else "failed", outcome["attempts"], outcome["status_code"], job_id, email)
+                    for email, outcome in outcomes.items()
+                )
+            )
+            self.connection.execute(
+                "UPDATE send_jobs SET sent_count = sent_count + ?, failed_count = failed_count + ?, updated_at = ? WHERE id = ?",
+                (sent_count, len(outcomes) - sent_count, datetime.now().isoformat(), job_id)
+            )
+
+    def set_status(self, job_id: str, status: str) -> None:
+        with self.lock, self.connection:
+            self.connection.execute(
+                "UPDATE send_jobs SET status = ?, updated_at = ? WHERE id = ?",
+                (status, datetime.now().isoformat(), job_id)
+            )
@@ -0,0 +1,35 @@
+import base64
+from typing import List, Dict, Any
+from .sendgrid import normalize_recipients, recipient_key
+
+RESULT_MODES = ("full", "failures", "summary", "bitmap")
+
+def compact_results(employee_emails: List[str], results: Dict[str, bool], mode: str = "failures") -> Dict[str, Any]:
+    if mode not in RESULT_MODES:
+        raise ValueError(f"Unknown result mode: {mode}")
+
+    recipients = normalize_recipients(employee_emails)
+    delivered = {recipient_key(email): success for email, success in results.items()}
+    flags = [bool(delivered.get(recipient_key(email))) for email in recipients]
+    sent_count = sum(flags)
+    summary = {
+        "result_mode": mode,
+        "sent_count": sent_count,
+        "total_count": len(recipients),
+        "failed_count": len(recipients) - sent_count
+    }
+
+    if mode == "full":
+        summary["results"] = dict(zip(recipients, flags))
+    elif mode == "failures":
+        summary["failed"] = [email for email, success in zip(recipients, flags) if not success]
+    elif mode == "bitmap":
+        summary["result_bitmap"] = encode_bitmap(flags)
+    return summary
+
+def encode_bitmap(flags: List[bool]) -> str:
+    bitmap = bytearray((len(flags) + 7) // 8)
+    for index, flag in enumerate(flags):
+        if flag:
+            bitmap[index // 8] |= 1 << (index % 8)
+    return base64.b64encode(bytes(bitmap)).decode("ascii")
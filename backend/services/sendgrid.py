@@ -1,42 +1,268 @@
 import os
+import asyncio
+import hashlib
+import random
+import threading
+from collections import OrderedDict
 from dotenv import load_dotenv
-from sendgrid import SendGridAPIClient
 from sendgrid.helpers.mail import Mail, Email, To, Content
-from typing import List, Dict
+from typing import List, Dict, Any, AsyncIterator, Optional, Tuple
+from .transport import MailTransport, create_transport
+from .ratelimit import AdaptiveRateLimiter, parse_retry_after
+from .tracing import Tracer, get_shared_tracer
+from .concurrency import bounded_as_completed
 
 load_dotenv()
 
+RECIPIENT_EMAIL_TAG = "-email-"
+
+def recipient_key(email: str) -> str:
+    return email.strip().lower()
+
+def normalize_recipients(employee_emails: List[str]) -> List[str]:
+    unique = {}
+    for email in employee_emails:
+        email = email.strip()
+        if email:
+            unique.setdefault(email.lower(), email)
+    return list(unique.values())
+
+def campaign_key(recipients: List[str]) -> str:
+    return hashlib.sha256("\n".join(map(recipient_key, recipients)).encode("utf-8")).hexdigest()
+
+class CampaignPlan:
+    def __init__(self, subject: str, content: str, html_content: str, batches: List[Tuple[List[str], Optional[Dict[str, Any]]]]):
+        self.subject = subject
+        self.content = content
+        self.html_content = html_content
+        self.batches = batches
+
 class EmailService:
-    def __init__(self):
+    def __init__(self, transport: MailTransport = None, tracer: Tracer = None):
         self.api_key = os.environ.get('SENDGRID_API_KEY')
         if not self.api_key:
             raise ValueError('SENDGRID_API_KEY environment variable must be set')
-        self.client = SendGridAPIClient(self.api_key)
+        self.transport = transport or create_transport(self.api_key)
         self.from_email = os.environ.get('SENDGRID_FROM_EMAIL', 'noreply@company.com')
         self.from_name = "TechFlow Solutions"
+        self.max_concurrency = int(os.environ.get('SENDGRID_MAX_CONCURRENCY', '20'))
+        self.batch_size = min(int(os.environ.get('SENDGRID_BATCH_SIZE', '1000')), 1000)
+        self.render_cache_size = int(os.environ.get('SENDGRID_RENDER_CACHE_SIZE', '128'))
+        self.render_cache = OrderedDict()
+        self.render_lock = threading.Lock()
+        self.rate_limiter = AdaptiveRateLimiter(float(os.environ.get('SENDGRID_RATE_LIMIT', '50')))
+        self.max_retries = int(os.environ.get('SENDGRID_MAX_RETRIES', '3'))
+        self.retry_base_delay = float(os.environ.get('SENDGRID_RETRY_BASE_DELAY', '0.5'))
+        self.retry_max_delay = float(os.environ.get('SENDGRID_RETRY_MAX_DELAY', '30'))
+        self.tracer = tracer or get_shared_tracer()
+        self.speculation_slots = int(os.environ.get('SENDGRID_SPECULATION_SLOTS', '8'))
+        self.speculations = OrderedDict()
+        self.speculation_stats = {"started": 0, "hits": 0, "misses": 0, "discarded": 0, "failed": 0}
     
     async def send_email_to_employee(self, employee_email: str, subject: str, content: str) -> bool:
+        html_content = self.render_campaign_html(subject, content)
+        outcome = await self.deliver_single(employee_email, subject, html_content)
+        return outcome["success"]
+    
+    async def deliver_single(self, employee_email: str, subject: str, html_content: str) -> Dict[str, Any]:
         try:
-            if not content.strip().startswith('<!DOCTYPE html>') and not content.strip().startswith('<html'):
-                content = self.create_professional_html_email(subject, content)
-            
             message = Mail(
                 from_email=Email(self.from_email, self.from_name),
-                to_emails=To(employee_email),
+                to_emails=self.build_recipient(employee_email, html_content),
                 subject=subject,
-                html_content=Content("text/html", content)
+                html_content=Content("text/html", html_content)
             )
-            
-            response = self.client.send(message)
-            return response.status_code == 202
+            return await self.post_message(message.get())
         except Exception as e:
-            return False
+            return {"success": False, "attempts": 0, "status_code": None, "error": type(e).__name__}
+    
+    async def deliver_batch(self, employee_emails: List[str], subject: str, html_content: str, payload: Dict[str, Any] = None) -> Dict[str, Dict[str, Any]]:
+        try:
+            if payload is None:
+                payload = self.build_batch_payload(employee_emails, subject, html_content)
+            outcome = await self.post_message(payload)
+        except Exception as e:
+            outcome = {"success": False, "attempts": 0, "status_code": None, "error": type(e).__name__}
+        
+        return {email: dict(outcome) for email in employee_emails}
+    
+    def build_batch_payload(self, employee_emails: List[str], subject: str, html_content: str) -> Dict[str, Any]:
+        message = Mail(
+            from_email=Email(self.from_email, self.from_name),
+            to_emails=[self.build_recipient(email, html_content) for email in employee_emails],
+            subject=subject,
+            html_content=Content("text/html", html_content),
+            is_multiple=True
+        )
+        return message.get()
+    
+    async def post_message(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        attempts = 0
+        
+        with self.tracer.span("mail.send", recipients=len(payload.get("personalizations", []))) as span:
+            while True:
+                attempts += 1
+                await self.rate_limiter.acquire()
+                status_code = None
+                retry_after = None
+                error = None
+                try:
+                    response = await self.transport.send(payload)
+                    status_code = response.status_code
+                    retry_after = parse_retry_after(response.headers)
+                except Exception as e:
+                    error = type(e).__name__
+                
+                if status_code == 429:
+                    self.rate_limiter.throttle(retry_after)
+                elif status_code is not None and status_code < 500:
+                    self.rate_limiter.recover()
+                
+                retryable = status_code is None or status_code == 429 or status_code >= 500
+                if not retryable or attempts > self.max_retries:
+                    span.set(attempts=attempts, status_code=status_code, transport_error=error)
+                    outcome = {"success": status_code == 202, "attempts": attempts, "status_code": status_code}
+                    if error:
+                        outcome["error"] = error
+                    return outcome
+                
+                await asyncio.sleep(self.retry_delay(attempts, retry_after))
+    
+    def retry_delay(self, attempts: int, retry_after: float = None) -> float:
+        backoff = random.uniform(0, min(self.retry_max_delay, self.retry_base_delay * (2 ** (attempts - 1))))
+        if retry_after is not None:
+            return max(retry_after, backoff)
+        return backoff
+    
+    def build_recipient(self, employee_email: str, html_content: str) -> To:
+        if RECIPIENT_EMAIL_TAG in html_content:
+            return To(employee_email, substitutions={RECIPIENT_EMAIL_TAG: employee_email})
+        return To(employee_email)
     
-    async def send_email_to_employees(self, employee_emails: List[str], subject: str, content: str) -> Dict[str, bool]:
-        results = {}
-        for email in employee_emails:
-            results[email] = await self.send_email_to_employee(email, subject, content)
-        return results
+    async def send_email_to_employees(self, employee_emails: List[str], subject: str, content: str, batched: bool = True) -> Dict[str, bool]:
+        outcomes = await self.send_campaign(employee_emails, subject, content, batched)
+        return {email: outcome["success"] for email, outcome in outcomes.items()}
+    
+    async def send_campaign(self, employee_emails: List[str], subject: str, content: str, batched: bool = True) -> Dict[str, Dict[str, Any]]:
+        delivered = {}
+        async for chunk_result in self.stream_campaign(employee_emails, subject, content, batched):
+            for email, outcome in chunk_result.items():
+                delivered[recipient_key(email)] = outcome
+        return {email: delivered.get(recipient_key(email)) for email in employee_emails}
+    
+    async def stream_campaign(self, employee_emails: List[str], subject: str, content: str, batched: bool = True) -> AsyncIterator[Dict[str, Dict[str, Any]]]:
+        if batched:
+            recipients = normalize_recipients(employee_emails)
+            plan = await self.take_plan(recipients, subject, content)
+            if plan is not None:
+                html_content = plan.html_content
+                chunks = iter(plan.batches)
+            else:
+                html_content = self.render_campaign_html(subject, content)
+                batch_size = max(1, self.batch_size)
+                chunks = ((recipients[i:i + batch_size], None) for i in range(0, len(recipients), batch_size))
+        else:
+            html_content = self.render_campaign_html(subject, content)
+            chunks = (([email], None) for email in employee_emails)
+        
+        async def send_chunk(chunk: List[str], payload: Optional[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+            if batched:
+                return await self.deliver_batch(chunk, subject, html_content, payload)
+            return {chunk[0]: await self.deliver_single(chunk[0], subject, html_content)}
+        
+        sends = bounded_as_completed((send_chunk(chunk, payload) for chunk, payload in chunks), self.max_concurrency)
+        try:
+            async for chunk_result in sends:
+                yield chunk_result
+        finally:
+            await sends.aclose()
+    
+    def speculate(self, employee_emails: List[str], subject: str, content: str) -> None:
+        recipients = normalize_recipients(employee_emails)
+        if not recipients or self.speculation_slots <= 0:
+            return
+        key = campaign_key(recipients)
+        existing = self.speculations.pop(key, None)
+        if existing is not None:
+            if existing[:2] == (subject, content):
+                self.speculations[key] = existing
+                return
+            existing[2].cancel()
+            self.speculation_stats["discarded"] += 1
+        
+        task = asyncio.ensure_future(asyncio.to_thread(self.build_campaign_plan, recipients, subject, content))
+        task.add_done_callback(self.finish_speculation)
+        self.speculations[key] = (subject, content, task)
+        self.speculation_stats["started"] += 1
+        while len(self.speculations) > self.speculation_slots:
+            self.speculations.popitem(last=False)[1][2].cancel()
+            self.speculation_stats["discarded"] += 1
+    
+    def finish_speculation(self, task: asyncio.Future) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            self.record_speculation_failure()
+    
+    def record_speculation_failure(self) -> None:
+        self.speculation_stats["failed"] += 1
+    
+    async def take_plan(self, recipients: List[str], subject: str, content: str) -> Optional[CampaignPlan]:
+        entry = self.speculations.pop(campaign_key(recipients), None) if self.speculations else None
+        if entry is None:
+            self.speculation_stats["misses"] += 1
+            return None
+        plan_subject, plan_content, task = entry
+        if (plan_subject, plan_content) != (subject, content):
+            task.cancel()
+            self.speculation_stats["discarded"] += 1
+            return None
+        try:
+            plan = await task
+        except Exception:
+            self.speculation_stats["misses"] += 1
+            return None
+        self.speculation_stats["hits"] += 1
+        return plan
+    
+    def build_campaign_plan(self, recipients: List[str], subject: str, content: str) -> CampaignPlan:
+        html_content = self.render_campaign_html(subject, content)
+        batch_size = max(1, self.batch_size)
+        batches = []
+        for i in range(0, len(recipients), batch_size):
+            chunk = recipients[i:i + batch_size]
+            try:
+                payload = self.build_batch_payload(chunk, subject, html_content)
+            except Exception:
+                payload = None
+            batches.append((chunk, payload))
+        return CampaignPlan(subject, content, html_content, batches)
+    
+    def get_speculation_stats(self) -> Dict[str, Any]:
+        return {**self.speculation_stats, "pending": len(self.speculations)}
+    
+    async def aclose(self) -> None:
+        for _, _, task in self.speculations.values():
+            task.cancel()
+        self.speculations.clear()
+        await self.transport.aclose()
+    
+    def render_campaign_html(self, subject: str, content: str) -> str:
+        stripped = content.strip()
+        if stripped.startswith('<!DOCTYPE html>') or stripped.startswith('<html'):
+            return content
+        
+        key = hashlib.sha256(f"{subject}\0{content}".encode("utf-8")).hexdigest()
+        with self.render_lock:
+            cached = self.render_cache.get(key)
+            if cached is not None:
+                self.render_cache.move_to_end(key)
+                return cached
+        
+        html_content = self.create_professional_html_email(subject, content)
+        with self.render_lock:
+            self.render_cache[key] = html_content
+            if len(self.render_cache) > max(1, self.render_cache_size):
+                self.render_cache.popitem(last=False)
+        return html_content
     
     def create_professional_html_email(self, subject: str, plain_content: str) -> str:
         paragraphs = plain_content.strip().split('\n\n')
@@ -139,7 +365,7 @@ class EmailService:
                     <a href="#" style="color: #2a5298; text-decoration: none; font-size: 12px; margin: 0 15px; font-weight: 500;">Security Center</a>
                 </div>
                 <p style="color: #9ca3af; font-size: 11px; margin: 0; line-height: 1.5;">
-                    This email was sent by TechFlow Solutions Inc. to keep you informed about your account and services.<br>
+                    This email was sent to {RECIPIENT_EMAIL_TAG} by TechFlow Solutions Inc. to keep you informed about your account and services.<br>
                     If you received this email in error, please contact us immediately.
                 </p>
             </div>
@@ -0,0 +1,132 @@
+import os
+import time
+import asyncio
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+import redis.asyncio as redis
+from dotenv import load_dotenv
+from typing import Optional
+
+load_dotenv()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS state_values (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    expires_at REAL
+);
+"""
+
+def connect_sqlite(db_path: str, retries: int = 50) -> sqlite3.Connection:
+    if os.path.dirname(db_path):
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    connection = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+    for attempt in range(retries):
+        try:
+            connection.execute("PRAGMA journal_mode=WAL")
+            return connection
+        except sqlite3.OperationalError:
+            if attempt == retries - 1:
+                raise
+            time.sleep(0.1)
+    return connection
+
+class StateStore(ABC):
+    @abstractmethod
+    async def get(self, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def set(self, key: str, value: str, ttl_seconds: float = None) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def add(self, key: str, value: str, ttl_seconds: float = None) -> bool:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    async def aclose(self) -> None:
+        pass
+
+class SQLiteStateStore(StateStore):
+    def __init__(self, db_path: str = None):
+        data_dir = os.environ.get("CORPMAIL_DATA_DIR", "data")
+        self.db_path = db_path or os.environ.get("STATE_DB", os.path.join(data_dir, "state.db"))
+        self.lock = threading.Lock()
+        self.connection = connect_sqlite(self.db_path)
+        self.connection.executescript(SCHEMA)
+        self.connection.commit()
+
+    async def get(self, key: str) -> Optional[str]:
+        return await asyncio.to_thread(self.read_value, key)
+
+    async def set(self, key: str, value: str, ttl_seconds: float = None) -> None:
+        await asyncio.to_thread(self.write_value, key, value, ttl_seconds, True)
+
+    async def add(self, key: str, value: str, ttl_seconds: float = None) -> bool:
+        return await asyncio.to_thread(self.write_value, key, value, ttl_seconds, False)
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(self.delete_value, key)
+
+    async def aclose(self) -> None:
+        with self.lock:
+            self.connection.close()
+
+    def read_value(self, key: str) -> Optional[str]:
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT value FROM state_values WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (key, time.time())
+            ).fetchone()
+        return row[0] if row else None
+
+    def write_value(self, key: str, value: str, ttl_seconds: Optional[float], replace: bool) -> bool:
+        now = time.time()
+        expires_at = now + ttl_seconds if ttl_seconds else None
+        with self.lock, self.connection:
+            if replace:
+                self.connection.execute("INSERT OR REPLACE INTO state_values (key, value, expires_at) VALUES (?, ?, ?)", (key, value, expires_at))
+                return True
+            self.connection.execute("DELETE FROM state_values WHERE key = ? AND expires_at <= ?", (key, now))
+            cursor = self.connection.execute("INSERT OR IGNORE INTO state_values (key, value, expires_at) VALUES (?, ?, ?)", (key, value, expires_at))
+            return cursor.rowcount == 1
+
+    def delete_value(self, key: str) -> None:
+        with self.lock, self.connection:
+            self.connection.execute("DELETE FROM state_values WHERE key = ?", (key,))
+
+class RedisStateStore(StateStore):
+    def __init__(self, url: str = None, pool_size: int = None):
+        self.url = url or os.environ.get("STATE_REDIS_URL", "redis://localhost:6379/0")
+        self.pool_size = pool_size if pool_size is not None else int(os.environ.get("STATE_REDIS_POOL_SIZE", "10"))
+        self.pool = redis.BlockingConnectionPool.from_url(self.url, max_connections=max(1, self.pool_size), decode_responses=True)
+        self.client = redis.Redis(connection_pool=self.pool)
+
+    async def get(self, key: str) -> Optional[str]:
+        return await self.client.get(key)
+
+    async def set(self, key: str, value: str, ttl_seconds: float = None) -> None:
+        await self.client.set(key, value, px=int(ttl_seconds * 1000) if ttl_seconds else None)
+
+    async def add(self, key: str, value: str, ttl_seconds: float = None) -> bool:
+        return bool(await self.client.set(key, value, nx=True, px=int(ttl_seconds * 1000) if ttl_seconds else None))
+
+    async def delete(self, key: str) -> None:
+        await self.client.delete(key)
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+        await self.pool.aclose()
+
+def create_state_store(kind: str = None) -> StateStore:
+    kind = (kind or os.environ.get("STATE_BACKEND", "sqlite")).lower()
+    if kind == "sqlite":
+        return SQLiteStateStore()
+    if kind == "redis":
+        return RedisStateStore()
+    raise ValueError(f"Unknown STATE_BACKEND: {kind}")
@@ -1,62 +1,70 @@
 from langchain.tools import tool
+from langchain_core.tools import BaseTool
 from typing import List
 import json
+import os
 from .llm import LLMService
 from .sendgrid import EmailService
+from .results import compact_results
+from .tracing import Tracer, get_shared_tracer
 
-llm_service = LLMService()
-email_service = EmailService()
-
-@tool
-async def generate_professional_email(topic: str, context: str = "") -> str:
-    """
-    Generate a professional email for company communications.
+def create_agent_tools(llm_service: LLMService, email_service: EmailService, result_mode: str = None, tracer: Tracer = None) -> List[BaseTool]:
+    agent_result_mode = result_mode or os.environ.get("AGENT_SEND_RESULT_MODE", "failures")
+    tracer = tracer or get_shared_tracer()
+    
+    @tool
+    async def generate_professional_email(topic: str, context: str = "", regenerate: bool = False) -> str:
+        """
+        Generate a professional email for company communications.
     
-    Args:
-        topic: The main topic or subject of the email
-        context: Additional context or details for the email
+        Args:
+            topic: The main topic or subject of the email
+            context: Additional context or details for the email
+            regenerate: Skip the draft cache and write a fresh version
     
-    Returns:
-        JSON string with 'subject' and 'body' fields
-    """
-    try:
-        email_content = await llm_service.generate_email(topic, context)
-        return email_content
-    except Exception as e:
-        return json.dumps({"error": f"Failed to generate email: {str(e)}"})
+        Returns:
+            JSON string with 'subject' and 'body' fields
+        """
+        with tracer.span("tool.generate_professional_email", regenerate=regenerate) as span:
+            try:
+                email_content = await llm_service.generate_email(topic, context, bypass_cache=regenerate)
+                return email_content
+            except Exception as e:
+                span.error = type(e).__name__
+                return json.dumps({"error": f"Failed to generate email: {str(e)}"})
 
-@tool
-async def send_email_to_employees(employee_emails: List[str], subject: str, email_body: str) -> str:
-    """
-    Send the generated email to all employees.
+    @tool
+    async def send_email_to_employees(employee_emails: List[str], subject: str, email_body: str) -> str:
+        """
+        Send the generated email to all employees.
     
-    Args:
-        employee_emails: List of employee email addresses
-        subject: Email subject line
-        email_body: Email body content
-        
-    Returns:
-        JSON string with sending results
-    """
-    try:
-        results = await email_service.send_email_to_employees(employee_emails, subject, email_body)
-        success_count = sum(1 for success in results.values() if success)
-        total_count = len(employee_emails)
+        Args:
+            employee_emails: List of employee email addresses
+            subject: Email subject line
+            email_body: Email body content
         
-        return json.dumps({
-            "success": True,
-            "sent_count": success_count,
-            "total_count": total_count,
-            "results": results,
-            "message": f"Email sent successfully to {success_count} out of {total_count} employees"
-        })
-    except Exception as e:
-        return json.dumps({
-            "success": False,
-            "error": f"Failed to send emails: {str(e)}"
-        })
+        Returns:
+            JSON string with sending results
+        """
+        with tracer.span("tool.send_email_to_employees", recipients=len(employee_emails)) as span:
+            try:
+                results = await email_service.send_email_to_employees(employee_emails, subject, email_body)
+                summary = compact_results(employee_emails, results, agent_result_mode)
+                span.set(sent_count=summary["sent_count"])
+            
+                return json.dumps({
+                    "success": True,
+                    **summary,
+                    "message": f"Email sent successfully to {summary['sent_count']} out of {summary['total_count']} employees"
+                })
+            except Exception as e:
+                span.error = type(e).__name__
+                return json.dumps({
+                    "success": False,
+                    "error": f"Failed to send emails: {str(e)}"
+                })
 
-AGENT_TOOLS = [
-    generate_professional_email,
-    send_email_to_employees
-]
+    return [
+        generate_professional_email,
+        send_email_to_employees
+    ]
@@ -0,0 +1,242 @@
+import os
+import json
+import time
+import queue
+import asyncio
+import secrets
+import threading
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dotenv import load_dotenv
+from typing import Any, AsyncGenerator, AsyncIterator, Dict, Iterator, List, Optional
+
+load_dotenv()
+
+class Span:
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.attributes = dict(attributes)
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.error: Optional[str] = None
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    @property
+    def duration_ms(self) -> float:
+        end_ns = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end_ns - self.start_ns) / 1e6
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time": self.start_ns / 1e9,
+            "duration_ms": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+            "error": self.error
+        }
+
+    def to_otlp(self) -> Dict[str, Any]:
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id or "",
+            "name": self.name,
+            "kind": 1,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or self.start_ns),
+            "attributes": [{"key": key, "value": otlp_value(value)} for key, value in self.attributes.items() if value is not None],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1}
+        }
+
+def otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+def message_stats(messages: List[Any]) -> Dict[str, int]:
+    return {
+        "message_count": len(messages),
+        "payload_bytes": sum(len(str(getattr(message, "content", message)).encode("utf-8")) for message in messages)
+    }
+
+current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+class OTLPFileExporter:
+    def __init__(self, path: str, service_name: str, max_pending: int = 1000):
+        self.path = path
+        self.service_name = service_name
+        self.pending: queue.Queue = queue.Queue(maxsize=max(1, max_pending))
+        self.dropped = 0
+        self.lock = threading.Lock()
+        self.thread: Optional[threading.Thread] = None
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+    def export(self, spans: List[Span]) -> None:
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name="otlp-file-exporter", daemon=True)
+                self.thread.start()
+        try:
+            self.pending.put_nowait(spans)
+        except queue.Full:
+            self.dropped += 1
+
+    def run(self) -> None:
+        while True:
+            batch = [self.pending.get()]
+            while True:
+                try:
+                    batch.append(self.pending.get_nowait())
+                except queue.Empty:
+                    break
+            traces = [spans for spans in batch if spans is not None]
+            try:
+                if traces:
+                    self.write(traces)
+            except OSError:
+                self.dropped += len(traces)
+            finally:
+                for _ in batch:
+                    self.pending.task_done()
+            if len(traces) < len(batch):
+                return
+
+    def write(self, traces: List[List[Span]]) -> None:
+        lines = "".join(json.dumps(self.build_payload(spans), default=str) + "\n" for spans in traces)
+        with open(self.path, "a", encoding="utf-8") as export_file:
+            export_file.write(lines)
+
+    def build_payload(self, spans: List[Span]) -> Dict[str, Any]:
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": self.service_name}}]},
+                "scopeSpans": [{"scope": {"name": "corpmail"}, "spans": [span.to_otlp() for span in spans]}]
+            }]
+        }
+
+    def close(self) -> None:
+        with self.lock:
+            thread, self.thread = self.thread, None
+        if thread is not None:
+            self.pending.put(None)
+            thread.join()
+
+class Tracer:
+    def __init__(self, buffer_size: int = None, export_path: str = None):
+        self.buffer_size = buffer_size if buffer_size is not None else int(os.environ.get("TRACE_BUFFER_SIZE", "5000"))
+        self.spans: deque = deque(maxlen=max(1, self.buffer_size))
+        self.open_traces: Dict[str, List[Span]] = {}
+        export_path = export_path if export_path is not None else os.environ.get("TRACE_EXPORT_PATH")
+        self.exporter = OTLPFileExporter(export_path, os.environ.get("OTEL_SERVICE_NAME", "corpmail")) if export_path else None
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Span]:
+        with self.detached_span(name, **attributes) as span, self.activate(span):
+            yield span
+
+    @contextmanager
+    def detached_span(self, name: str, **attributes: Any) -> Iterator[Span]:
+        span = self.start(name, attributes)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = type(e).__name__
+            raise
+        finally:
+            self.finish(span)
+
+    @contextmanager
+    def activate(self, span: Span) -> Iterator[Span]:
+        token = current_span.set(span)
+        try:
+            yield span
+        finally:
+            current_span.reset(token)
+
+    async def iterate(self, span: Span, iterator: AsyncGenerator[Any, None]) -> AsyncIterator[Any]:
+        try:
+            while True:
+                with self.activate(span):
+                    try:
+                        item = await iterator.__anext__()
+                    except StopAsyncIteration:
+                        return
+                yield item
+        finally:
+            await iterator.aclose()
+
+    def start(self, name: str, attributes: Dict[str, Any]) -> Span:
+        parent = current_span.get()
+        span = Span(name, parent.trace_id if parent else secrets.token_hex(16), parent.span_id if parent else None, attributes)
+        self.open_traces.setdefault(span.trace_id, []).append(span)
+        while len(self.open_traces) > self.buffer_size:
+            self.open_traces.pop(next(iter(self.open_traces)))
+        return span
+
+    def finish(self, span: Span) -> None:
+        span.end_ns = time.time_ns()
+        self.spans.append(span)
+        if span.parent_id is None:
+            trace_spans = self.open_traces.pop(span.trace_id, [span])
+            if self.exporter is not None:
+                self.exporter.export(trace_spans)
+
+    async def aclose(self) -> None:
+        if self.exporter is not None:
+            await asyncio.to_thread(self.exporter.close)
+
+    def get_traces(self, limit: int = 20, order: str = "recent", name: str = None) -> List[Dict[str, Any]]:
+        grouped: Dict[str, List[Span]] = {}
+        roots: Dict[str, Span] = {}
+        for span in self.spans:
+            grouped.setdefault(span.trace_id, []).append(span)
+            if span.parent_id is None:
+                roots[span.trace_id] = span
+
+        candidates = [root for root in roots.values() if name is None or root.name == name]
+        if order == "slowest":
+            candidates.sort(key=lambda root: root.duration_ms, reverse=True)
+        else:
+            candidates.sort(key=lambda root: root.start_ns, reverse=True)
+        return [self.describe_trace(root, grouped[root.trace_id]) for root in candidates[:limit]]
+
+    def get_trace(self, trace_id: str) -> Optional[Dict[str, Any]]:
+        spans = [span for span in self.spans if span.trace_id == trace_id]
+        root = next((span for span in spans if span.parent_id is None), None)
+        return self.describe_trace(root, spans) if root else None
+
+    def describe_trace(self, root: Span, spans: List[Span]) -> Dict[str, Any]:
+        breakdown: Dict[str, float] = {}
+        for span in spans:
+            if span is not root:
+                breakdown[span.name] = round(breakdown.get(span.name, 0.0) + span.duration_ms, 3)
+        return {
+            "trace_id": root.trace_id,
+            "name": root.name,
+            "duration_ms": round(root.duration_ms, 3),
+            "error": root.error,
+            "breakdown_ms": breakdown,
+            "spans": [span.to_dict() for span in sorted(spans, key=lambda span: span.start_ns)]
+        }
+
+shared_tracer: Optional[Tracer] = None
+
+def get_shared_tracer() -> Tracer:
+    global shared_tracer
+    if shared_tracer is None:
+        shared_tracer = Tracer()
+    return shared_tracer
@@ -0,0 +1,89 @@
+import os
+import asyncio
+import httpx
+from abc import ABC, abstractmethod
+from dotenv import load_dotenv
+from sendgrid import SendGridAPIClient
+from python_http_client.exceptions import HTTPError
+from typing import Any, Dict, Optional
+
+load_dotenv()
+
+MAIL_SEND_PATH = "/v3/mail/send"
+
+class TransportResponse:
+    def __init__(self, status_code: int, headers: Optional[Dict[str, str]] = None, body: str = ""):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.body = body
+
+class MailTransport(ABC):
+    @abstractmethod
+    async def send(self, payload: Dict[str, Any]) -> TransportResponse:
+        raise NotImplementedError
+
+    async def aclose(self) -> None:
+        pass
+
+class SendGridClientTransport(MailTransport):
+    def __init__(self, api_key: str, base_url: str = None):
+        self.client = SendGridAPIClient(api_key, host=base_url or os.environ.get("SENDGRID_API_URL", "https://api.sendgrid.com"))
+
+    async def send(self, payload: Dict[str, Any]) -> TransportResponse:
+        try:
+            response = await asyncio.to_thread(self.client.client.mail.send.post, request_body=payload)
+        except HTTPError as e:
+            return TransportResponse(e.status_code, dict(e.headers or {}), e.body.decode("utf-8", "replace") if isinstance(e.body, bytes) else str(e.body or ""))
+        body = response.body.decode("utf-8", "replace") if isinstance(response.body, bytes) else str(response.body or "")
+        return TransportResponse(response.status_code, dict(response.headers or {}), body)
+
+class HttpxTransport(MailTransport):
+    shared_clients: Dict[tuple, httpx.AsyncClient] = {}
+
+    def __init__(self, api_key: str, base_url: str = None, pool_size: int = None, connect_timeout: float = None, read_timeout: float = None, http2: bool = None):
+        self.api_key = api_key
+        self.base_url = (base_url or os.environ.get("SENDGRID_API_URL", "https://api.sendgrid.com")).rstrip("/")
+        self.pool_size = pool_size if pool_size is not None else int(os.environ.get("SENDGRID_POOL_SIZE", "100"))
+        self.connect_timeout = connect_timeout if connect_timeout is not None else float(os.environ.get("SENDGRID_CONNECT_TIMEOUT", "5"))
+        self.read_timeout = read_timeout if read_timeout is not None else float(os.environ.get("SENDGRID_READ_TIMEOUT", "30"))
+        self.http2 = http2 if http2 is not None else os.environ.get("SENDGRID_HTTP2", "false").lower() in ("1", "true", "yes")
+        self.headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
+        self.shared_client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self.shared_client is not None and not self.shared_client.is_closed:
+            return self.shared_client
+        key = (self.base_url, self.pool_size, self.connect_timeout, self.read_timeout, self.http2)
+        client = self.shared_clients.get(key)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                base_url=self.base_url,
+                http2=self.http2,
+                limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size),
+                timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout)
+            )
+            self.shared_clients[key] = client
+        self.shared_client = client
+        return client
+
+    async def send(self, payload: Dict[str, Any]) -> TransportResponse:
+        response = await self.client.post(MAIL_SEND_PATH, json=payload, headers=self.headers)
+        return TransportResponse(response.status_code, dict(response.headers), response.text)
+
+    async def aclose(self) -> None:
+        self.shared_client = None
+
+async def close_shared_transports() -> None:
+    clients = list(HttpxTransport.shared_clients.values())
+    HttpxTransport.shared_clients.clear()
+    for client in clients:
+        await client.aclose()
+
+def create_transport(api_key: str, kind: str = None) -> MailTransport:
+    kind = (kind or os.environ.get("SENDGRID_TRANSPORT", "httpx")).lower()
+    if kind == "httpx":
+        return HttpxTransport(api_key)
+    if kind == "sendgrid":
+        return SendGridClientTransport(api_key)
+    raise ValueError(f"Unknown SENDGRID_TRANSPORT: {kind}")
@@ -0,0 +1,77 @@
+import os
+import sys
+import json
+import time
+import tempfile
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common import percentile
+
+async def run_level(client, concurrency: int, requests: int, path: str) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def one(index: int) -> None:
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            if path == "message":
+                response = await client.post("/chat/message", json={"message": f"Generate an email about office update {concurrency}-{index}"})
+            else:
+                drafts = [{"topic": f"office update {concurrency}-{index}-{item}"} for item in range(5)]
+                response = await client.post("/chat/drafts/batch", json={"drafts": drafts})
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(index) for index in range(requests)))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": requests,
+        "errors": errors,
+        "seconds": elapsed,
+        "throughput": requests / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000
+    }
+
+async def run(args) -> None:
+    import httpx
+    from main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        print(f"{'path':>8} {'conc':>5} {'reqs':>6} {'errors':>6} {'seconds':>9} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8}")
+        for concurrency in [int(value) for value in args.concurrency.split(",") if value]:
+            result = await run_level(client, concurrency, args.requests, args.path)
+            print(f"{args.path:>8} {concurrency:>5} {result['requests']:>6} {result['errors']:>6} {result['seconds']:>9.3f} {result['throughput']:>8.1f} {result['p50_ms']:>8.1f} {result['p99_ms']:>8.1f}")
+    print(f"parse outcomes: {json.dumps(app.state.container.parse_stats.get_stats())}")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load-test the chat routes offline against the stub LLM backend")
+    parser.add_argument("--path", choices=("message", "batch"), default="message")
+    parser.add_argument("--concurrency", default="1,10,50")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--tokens-per-second", type=float, default=500.0)
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    os.environ["LLM_BACKEND"] = "stub"
+    os.environ["LLM_STUB_LATENCY_MS"] = str(args.latency_ms)
+    os.environ["LLM_STUB_TOKENS_PER_SECOND"] = str(args.tokens_per_second)
+    os.environ["LLM_STUB_MALFORMED_RATE"] = str(args.malformed_rate)
+    os.environ["LLM_STUB_SEED"] = str(args.seed)
+    os.environ.setdefault("SENDGRID_API_KEY", "SG.benchmark")
+    os.environ["CORPMAIL_DATA_DIR"] = tempfile.mkdtemp(prefix="corpmail-bench-")
+
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+import os
+import sys
+import json
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.services.intent import intent_router
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "intent_corpus.jsonl")
+
+GENERATE_PHRASES = ["generate email", "write email", "create email", "email about", "write an email", "make email",
+                    "regenerate email", "rewrite email", "enhance email",
+                    "compose email", "draft email", "email on", "create a", "write a", "send a", "make a",
+                    "announcement", "meeting", "holiday", "greeting", "update", "invite", "inform", "notify"]
+SEND_PHRASES = ["send email", "send it", "send the email"]
+REGENERATE_PHRASES = ["enhance", "regenerate", "rewrite", "improve", "another version"]
+REVISION_PHRASES = ["enhance it", "improve it", "rewrite it", "regenerate it", "another version"]
+
+def legacy_topic(message: str) -> str:
+    message_lower = message.lower()
+    patterns = [
+        "write an email about", "write email about", "email about",
+        "write an email on", "write email on", "email on",
+        "create email about", "create email on",
+        "make email about", "make email on",
+        "compose email about", "compose email on",
+        "draft email about", "draft email on",
+        "generate email about", "generate email on"
+    ]
+    for pattern in patterns:
+        if pattern in message_lower:
+            topic = message_lower.split(pattern)[-1].strip()
+            if topic:
+                return topic
+    fallback_patterns = ["write email", "create email", "make email", "compose email", "draft email", "generate email"]
+    for pattern in fallback_patterns:
+        if pattern in message_lower:
+            topic = message_lower.split(pattern)[-1].strip()
+            if topic:
+                return topic
+    natural_patterns = ["create a", "write a", "send a", "make a", "make an", "create an", "write an"]
+    for pattern in natural_patterns:
+        if pattern in message_lower:
+            topic = message_lower.split(pattern)[-1].strip()
+            if topic:
+                return topic
+    if "announce" in message_lower:
+        if "announce that" in message_lower:
+            topic = message_lower.split("announce that")[-1].strip()
+        else:
+            topic = message_lower.split("announce")[-1].strip()
+        if topic:
+            return topic
+    return message_lower if message_lower else "General company communication"
+
+def legacy_route(message: str) -> dict:
+    lower = message.lower()
+    if any(p in lower for p in REVISION_PHRASES):
+        return {"intent": "regenerate"}
+    if any(p in lower for p in GENERATE_PHRASES):
+        return {"intent": "generate", "regenerate": any(p in lower for p in REGENERATE_PHRASES), "topic": legacy_topic(message)}
+    if any(p in lower for p in SEND_PHRASES):
+        return {"intent": "send"}
+    if any(p in lower for p in REGENERATE_PHRASES):
+        return {"intent": "regenerate"}
+    return {"intent": "help"}
+
+def routed(message: str) -> dict:
+    match = intent_router.route(message)
+    if match.intent == "generate":
+        return {"intent": match.intent, "regenerate": match.regenerate, "topic": match.topic}
+    return {"intent": match.intent}
+
+def time_per_call(function, messages: list, rounds: int) -> float:
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for message in messages:
+            function(message)
+    return (time.perf_counter() - started) / (rounds * len(messages))
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Check the intent router against the golden corpus and compare it with the phrase-scan version")
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--write-corpus", action="store_true", help="Re-record expected results from the phrase-scan reference")
+    args = parser.parse_args()
+
+    with open(CORPUS_PATH, encoding="utf-8") as corpus_file:
+        corpus = [json.loads(line) for line in corpus_file if line.strip()]
+
+    if args.write_corpus:
+        with open(CORPUS_PATH, "w", encoding="utf-8") as corpus_file:
+            for case in corpus:
+                corpus_file.write(json.dumps({"message": case["message"], **legacy_route(case["message"])}, ensure_ascii=False) + "\n")
+        print(f"recorded {len(corpus)} cases")
+        return
+
+    mismatches = 0
+    for case in corpus:
+        expected = {key: value for key, value in case.items() if key != "message"}
+        actual = routed(case["message"])
+        if actual != expected:
+            mismatches += 1
+            print(f"MISMATCH {case['message']!r}: expected {expected}, got {actual}")
+    print(f"golden corpus: {len(corpus) - mismatches}/{len(corpus)} cases match")
+
+    filler = " Please keep the tone warm and mention that questions can go to the people team or to your manager directly."
+    print(f"{'messages':>10} {'avg chars':>10} {'phrase-scan us':>15} {'compiled us':>12}")
+    for label, padding in (("corpus", 0), ("padded", 2), ("long", 10)):
+        messages = [case["message"] + filler * padding for case in corpus]
+        legacy = time_per_call(legacy_route, messages, args.rounds)
+        compiled = time_per_call(intent_router.route, messages, args.rounds)
+        average = sum(len(message) for message in messages) / len(messages)
+        print(f"{label:>10} {average:>10.0f} {legacy * 1e6:>15.2f} {compiled * 1e6:>12.2f}")
+    sys.exit(1 if mismatches else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+import os
+import sys
+import time
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.services import mock_groq
+from common import free_port, start_stand_in, percentile
+
+async def run_blocking(concurrency: int, model: str) -> list:
+    from groq import Groq
+
+    client = Groq(api_key=os.environ["GROQ_API_KEY"])
+    latencies = []
+
+    async def generate() -> None:
+        started = time.perf_counter()
+        client.chat.completions.create(model=model, messages=[{"role": "user", "content": "Write a meeting announcement"}])
+        latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(generate() for _ in range(concurrency)))
+    client.close()
+    return latencies
+
+async def run_async(concurrency: int) -> list:
+    from backend.services.llm import LLMService
+    from backend.services.llm_backends import GroqBackend
+
+    service = LLMService(backend=GroqBackend())
+    latencies = []
+
+    async def generate(index: int) -> None:
+        started = time.perf_counter()
+        await service.generate_email(f"Meeting announcement {index}", "", bypass_cache=True)
+        latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(generate(index) for index in range(concurrency)))
+    await service.aclose()
+    return latencies
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare blocking and async Groq clients under concurrent draft generation")
+    parser.add_argument("--concurrency", default="1,10,50", help="Comma separated numbers of concurrent generate_email calls")
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--url", help="Use an already running Groq-compatible endpoint instead of starting the stand-in")
+    args = parser.parse_args()
+
+    if args.url:
+        os.environ["GROQ_BASE_URL"] = args.url
+    else:
+        mock_groq.configure(latency_ms=args.latency_ms)
+        port = free_port()
+        start_stand_in(mock_groq.app, port)
+        os.environ["GROQ_BASE_URL"] = f"http://127.0.0.1:{port}"
+    os.environ.setdefault("GROQ_API_KEY", "gsk_benchmark")
+
+    print(f"{'client':>8} {'calls':>6} {'seconds':>9} {'calls/s':>9} {'p50 ms':>8} {'p99 ms':>8}")
+    for concurrency in [int(value) for value in args.concurrency.split(",") if value]:
+        for name, runner in (("blocking", lambda: run_blocking(concurrency, "llama-3.1-8b-instant")), ("async", lambda: run_async(concurrency))):
+            started = time.perf_counter()
+            latencies = asyncio.run(runner())
+            elapsed = time.perf_counter() - started
+            print(f"{name:>8} {concurrency:>6} {elapsed:>9.3f} {concurrency / elapsed:>9.1f} {percentile(latencies, 0.50) * 1000:>8.1f} {percentile(latencies, 0.99) * 1000:>8.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import os
+import time
+import asyncio
+import argparse
+from typing import Any, Dict, List, Optional
+
+class RedisStandIn:
+    def __init__(self):
+        self.values: Dict[str, Any] = {}
+        self.expires: Dict[str, float] = {}
+        self.commands = 0
+
+    def alive(self, key: str) -> bool:
+        expires_at = self.expires.get(key)
+        if expires_at is not None and expires_at <= time.monotonic():
+            self.values.pop(key, None)
+            self.expires.pop(key, None)
+        return key in self.values
+
+    def execute(self, command: str, args: List[str]) -> Any:
+        self.commands += 1
+        if command == "PING":
+            return "PONG"
+        if command == "HELLO":
+            return {"server": "redis", "version": "7.2.0", "proto": int(args[0]) if args else 2, "mode": "standalone", "role": "master"}
+        if command in ("SELECT", "AUTH", "CLIENT"):
+            return "OK"
+        if command == "GET":
+            return self.values[args[0]] if self.alive(args[0]) else None
+        if command == "SET":
+            return self.set(args)
+        if command == "DEL":
+            removed = 0
+            for key in args:
+                if self.alive(key):
+                    removed += 1
+                self.values.pop(key, None)
+                self.expires.pop(key, None)
+            return removed
+        raise ValueError(f"ERR unknown command '{command}'")
+
+    def set(self, args: List[str]) -> Optional[str]:
+        key, value, options = args[0], args[1], [option.upper() for option in args[2:]]
+        if "NX" in options and self.alive(key):
+            return None
+        self.values[key] = value
+        self.expires.pop(key, None)
+        for unit, scale in (("EX", 1.0), ("PX", 0.001)):
+            if unit in options:
+                self.expires[key] = time.monotonic() + float(args[2 + options.index(unit) + 1]) * scale
+        return "OK"
+
+def encode(reply: Any, protocol: int = 2) -> bytes:
+    if reply is None:
+        return b"_\r\n" if protocol == 3 else b"$-1\r\n"
+    if isinstance(reply, int):
+        return f":{reply}\r\n".encode()
+    if isinstance(reply, dict):
+        items = [encode(key, protocol) + encode(value, protocol) for key, value in reply.items()]
+        return f"{'%' if protocol == 3 else '*'}{len(items) if protocol == 3 else 2 * len(items)}\r\n".encode() + b"".join(items)
+    if reply in ("OK", "PONG"):
+        return f"+{reply}\r\n".encode()
+    data = reply.encode("utf-8")
+    return f"${len(data)}\r\n".encode() + data + b"\r\n"
+
+async def read_command(reader: asyncio.StreamReader) -> Optional[List[str]]:
+    line = await reader.readline()
+    if not line:
+        return None
+    if not line.startswith(b"*"):
+        return line.decode("utf-8").split()
+    args = []
+    for _ in range(int(line[1:-2])):
+        size = int((await reader.readline())[1:-2])
+        args.append((await reader.readexactly(size + 2))[:-2].decode("utf-8"))
+    return args
+
+async def serve(host: str = "127.0.0.1", port: int = 6390, store: RedisStandIn = None) -> asyncio.AbstractServer:
+    store = store or RedisStandIn()
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        protocol = 2
+        try:
+            while True:
+                args = await read_command(reader)
+                if not args:
+                    break
+                try:
+                    result = store.execute(args[0].upper(), args[1:])
+                    if isinstance(result, dict):
+                        protocol = result["proto"]
+                    reply = encode(result, protocol)
+                except (ValueError, IndexError) as e:
+                    reply = f"-{e}\r\n".encode()
+                writer.write(reply)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
+
+async def main(host: str, port: int) -> None:
+    server = await serve(host, port)
+    async with server:
+        await server.serve_forever()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Minimal Redis-protocol stand-in for the state store")
+    parser.add_argument("--host", default=os.environ.get("MOCK_REDIS_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("MOCK_REDIS_PORT", "6390")))
+    args = parser.parse_args()
+    asyncio.run(main(args.host, args.port))
@@ -0,0 +1,88 @@
+import os
+import sys
+import time
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.services import mock_sendgrid
+from common import free_port, start_stand_in, percentile
+
+class TimedTransport:
+    def __init__(self, transport):
+        self.transport = transport
+        self.latencies = []
+
+    async def send(self, payload):
+        started = time.perf_counter()
+        try:
+            return await self.transport.send(payload)
+        finally:
+            self.latencies.append(time.perf_counter() - started)
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+async def run_size(size: int, batched: bool) -> dict:
+    from backend.services.sendgrid import EmailService
+    from backend.services.transport import create_transport, close_shared_transports
+
+    transport = TimedTransport(create_transport(os.environ["SENDGRID_API_KEY"]))
+    service = EmailService(transport=transport)
+    recipients = [f"employee{i}@bench.techflow.test" for i in range(size)]
+
+    started = time.perf_counter()
+    results = await service.send_email_to_employees(recipients, "Benchmark announcement", "Hello team,\n\nThis is a benchmark send.", batched=batched)
+    elapsed = time.perf_counter() - started
+    await service.aclose()
+    await close_shared_transports()
+
+    sent = sum(1 for success in results.values() if success)
+    return {
+        "recipients": size,
+        "sent": sent,
+        "requests": len(transport.latencies),
+        "seconds": elapsed,
+        "throughput": sent / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(transport.latencies, 0.50) * 1000,
+        "p99_ms": percentile(transport.latencies, 0.99) * 1000
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark EmailService against a local SendGrid stand-in")
+    parser.add_argument("--sizes", default="10,1000,50000", help="Comma separated recipient counts")
+    parser.add_argument("--unbatched", action="store_true", help="Send one request per recipient")
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--rate-5xx", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=0.1)
+    parser.add_argument("--max-personalizations", type=int, default=1000)
+    parser.add_argument("--url", help="Use an already running stand-in instead of starting one")
+    args = parser.parse_args()
+
+    if args.url:
+        os.environ["SENDGRID_API_URL"] = args.url
+    else:
+        mock_sendgrid.configure(
+            latency_ms=args.latency_ms,
+            jitter_ms=args.jitter_ms,
+            rate_429=args.rate_429,
+            rate_5xx=args.rate_5xx,
+            retry_after=args.retry_after,
+            max_personalizations=args.max_personalizations
+        )
+        port = free_port()
+        start_stand_in(mock_sendgrid.app, port)
+        os.environ["SENDGRID_API_URL"] = f"http://127.0.0.1:{port}"
+    os.environ.setdefault("SENDGRID_API_KEY", "SG.benchmark")
+    os.environ.setdefault("SENDGRID_TRANSPORT", "httpx")
+
+    print(f"{'recipients':>10} {'sent':>8} {'requests':>9} {'seconds':>9} {'rcpt/s':>10} {'p50 ms':>8} {'p99 ms':>8}")
+    for size in [int(value) for value in args.sizes.split(",") if value]:
+        row = asyncio.run(run_size(size, not args.unbatched))
+        print(f"{row['recipients']:>10} {row['sent']:>8} {row['requests']:>9} {row['seconds']:>9.3f} {row['throughput']:>10.1f} {row['p50_ms']:>8.1f} {row['p99_ms']:>8.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,14 @@
 import streamlit as st
 import requests
 import json
+import time
+import uuid
 from dotenv import load_dotenv
 
 load_dotenv()
 
 API_BASE_URL = "http://localhost:8000"
+REQUEST_RETRIES = 3
 
 def get_email_counts(email_list):
     gmail_count = sum(1 for email in email_list if email.lower().endswith('@gmail.com'))
@@ -13,6 +16,64 @@ def get_email_counts(email_list):
     other_count = total_count - gmail_count
     return gmail_count, total_count, other_count
 
+def wait_for_send_job(job, max_wait_seconds=30):
+    deadline = time.time() + max_wait_seconds
+    with st.spinner(f"📤 Sending to {job['total_count']} recipients..."):
+        while job.get("status") in ("queued", "running") and time.time() < deadline:
+            time.sleep(1)
+            status_response = requests.get(f"{API_BASE_URL}/email/jobs/{job['job_id']}", timeout=10)
+            if status_response.status_code != 200:
+                break
+            job = status_response.json()
+    return job
+
+def post_with_retries(url, idempotency_key, **kwargs):
+    for attempt in range(1, REQUEST_RETRIES + 1):
+        try:
+            response = requests.post(url, headers={"Idempotency-Key": idempotency_key}, **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            if attempt == REQUEST_RETRIES:
+                raise
+        else:
+            if response.status_code < 500 or attempt == REQUEST_RETRIES:
+                return response
+            response.close()
+        time.sleep(0.5 * attempt)
+
+def stream_chat_response(prompt, idempotency_key):
+    draft = {"subject": "", "body": ""}
+    result = None
+    with st.chat_message("assistant"):
+        placeholder = st.empty()
+        placeholder.markdown("✍️ *Thinking...*")
+        with post_with_retries(
+            f"{API_BASE_URL}/chat/message/stream",
+            idempotency_key,
+            json={
+                "message": prompt,
+                "employee_emails": st.session_state.employee_emails,
+                "thread_id": st.session_state.thread_id
+            },
+            stream=True,
+            timeout=30
+        ) as response:
+            if response.status_code != 200:
+                return None
+            for line in response.iter_lines(decode_unicode=True):
+                if not line:
+                    continue
+                event = json.loads(line)
+                if event["event"] == "status":
+                    placeholder.markdown(event["response"])
+                elif event["event"] == "delta":
+                    draft[event["field"]] += event["text"]
+                    placeholder.markdown(f"**📧 Subject:** {draft['subject']}\n\n{draft['body']}▌")
+                elif event["event"] == "result":
+                    result = event
+                elif event["event"] == "error":
+                    return None
+    return result
+
 st.set_page_config(
     page_title="AI Email Sender - CEO Dashboard", 
     page_icon="📧", 
@@ -28,6 +89,10 @@ if "email_draft" not in st.session_state:
     st.session_state.email_draft = ""
 if "pending_send" not in st.session_state:
     st.session_state.pending_send = False
+if "thread_id" not in st.session_state:
+    st.session_state.thread_id = str(uuid.uuid4())
+if "send_key" not in st.session_state:
+    st.session_state.send_key = str(uuid.uuid4())
 
 def main():
     st.markdown("""
@@ -374,17 +439,11 @@ def main():
             st.session_state.messages.append({"role": "user", "content": prompt})
             
             try:
-                response = requests.post(
-                    f"{API_BASE_URL}/chat/message",
-                    json={
-                        "message": prompt,
-                        "employee_emails": st.session_state.employee_emails
-                    },
-                    timeout=30
-                )
+                with st.chat_message("user"):
+                    st.markdown(prompt)
+                result = stream_chat_response(prompt, str(uuid.uuid4()))
                 
-                if response.status_code == 200:
-                    result = response.json()
+                if result is not None:
                     ai_response = result.get("response", "Sorry, I couldn't process that request.")
                     
                     st.session_state.messages.append({"role": "assistant", "content": ai_response})
@@ -468,24 +527,31 @@ def main():
                     
                     if st.button("🚀 Send Email to All Recipients", type="primary", use_container_width=True):
                         try:
-                            send_response = requests.post(
+                            send_payload = {
+                                "subject": st.session_state.email_subject,
+                                "body": st.session_state.email_body,
+                                "employee_emails": st.session_state.employee_emails
+                            }
+                            send_response = post_with_retries(
                                 f"{API_BASE_URL}/email/send",
-                                json={
-                                    "subject": st.session_state.email_subject,
-                                    "body": st.session_state.email_body,
-                                    "employee_emails": st.session_state.employee_emails
-                                },
+                                st.session_state.send_key,
+                                json=send_payload,
                                 timeout=30
                             )
+                            st.session_state.send_key = str(uuid.uuid4())
                             
-                            if send_response.status_code == 200:
-                                result = send_response.json()
-                                if result.get("success"):
-                                    st.success(result.get("message", "Email sent successfully!"))
+                            if send_response.status_code in (200, 202):
+                                job = wait_for_send_job(send_response.json())
+                                if job.get("status") == "completed":
+                                    st.success(f"Email sent successfully to {job['sent_count']} out of {job['total_count']} recipients")
                                     st.session_state.email_draft = ""
                                     st.session_state.pending_send = False
+                                elif job.get("status") == "failed":
+                                    st.error("Failed to send email to any recipients")
                                 else:
-                                    st.error(f"Failed to send email: {result.get('message', 'Unknown error')}")
+                                    st.info(f"📤 Still sending in the background: {job['sent_count']} sent, {job['queued_count']} queued (job {job['job_id']})")
+                                    st.session_state.email_draft = ""
+                                    st.session_state.pending_send = False
                             else:
                                 st.error("Failed to send email")
                                 
@@ -1,13 +1,22 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from contextlib import asynccontextmanager
 import uvicorn
 import os
 from dotenv import load_dotenv
 from backend.routes import chat_router, email_router
+from backend.container import ServiceContainer
 
 load_dotenv()
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await app.state.container.startup()
+    yield
+    await app.state.container.shutdown()
+
+app = FastAPI(lifespan=lifespan)
+app.state.container = ServiceContainer()
 
 app.add_middleware(
     CORSMiddleware,
@@ -19,3 +28,11 @@ app.add_middleware(
 
 app.include_router(chat_router)
 app.include_router(email_router)
+
+if __name__ == "__main__":
+    uvicorn.run(
+        "main:app",
+        host=os.environ.get("API_HOST", "0.0.0.0"),
+        port=int(os.environ.get("API_PORT", "8000")),
+        workers=int(os.environ.get("API_WORKERS", "1"))
+    )
@@ -0,0 +1,169 @@
+import asyncio
+
+import pytest
+
+from backend.services.coalesce import SingleFlight
+
+class Upstream:
+    def __init__(self, delay: float = 0.05, error: Exception = None):
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+        self.cancelled = 0
+
+    async def call(self):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.error is not None:
+            raise self.error
+        return f"result {self.calls}"
+
+    async def stream(self):
+        self.calls += 1
+        try:
+            for index in range(3):
+                await asyncio.sleep(self.delay / 3)
+                yield index
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.error is not None:
+            raise self.error
+        yield "done"
+
+async def collect(events):
+    return [event async for event in events]
+
+def test_run_shares_one_call():
+    async def scenario():
+        flight = SingleFlight()
+        upstream = Upstream()
+        results = await asyncio.gather(*[flight.run("key", upstream.call) for _ in range(4)])
+        return upstream.calls, results, flight.get_stats()
+
+    calls, results, stats = asyncio.run(scenario())
+    assert calls == 1
+    assert results == ["result 1"] * 4
+    assert stats == {"leaders": 1, "joined": 3, "abandoned": 0, "in_flight": 0}
+
+def test_run_propagates_errors_to_every_caller():
+    async def scenario():
+        flight = SingleFlight()
+        upstream = Upstream(error=ValueError("upstream failed"))
+        return await asyncio.gather(*[flight.run("key", upstream.call) for _ in range(3)], return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert [type(result) for result in results] == [ValueError] * 3
+
+def test_cancelled_caller_detaches_without_cancelling_others():
+    async def scenario():
+        flight = SingleFlight()
+        upstream = Upstream()
+        first = asyncio.ensure_future(flight.run("key", upstream.call))
+        second = asyncio.ensure_future(flight.run("key", upstream.call))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second, first.cancelled(), upstream.cancelled
+
+    assert asyncio.run(scenario()) == ("result 1", True, 0)
+
+def test_last_cancelled_caller_cancels_the_call():
+    async def scenario():
+        flight = SingleFlight()
+        upstream = Upstream()
+        caller = asyncio.ensure_future(flight.run("key", upstream.call))
+        await asyncio.sleep(0.01)
+        caller.cancel()
+        await asyncio.gather(caller, return_exceptions=True)
+        await asyncio.sleep(0)
+        stats = flight.get_stats()
+        retry = await flight.run("key", upstream.call)
+        return upstream.cancelled, stats, retry
+
+    cancelled, stats, retry = asyncio.run(scenario())
+    assert cancelled == 1
+    assert stats["abandoned"] == 1 and stats["in_flight"] == 0
+    assert retry == "result 2"
+
+def test_stream_fans_out_to_late_joiners():
+    async def scenario():
+        flight = SingleFlight()
+        upstream = Upstream()
+
+        async def late():
+            await asyncio.sleep(0.03)
+            return await collect(flight.stream("key", upstream.stream))
+
+        results = await asyncio.gather(collect(flight.stream("key", upstream.stream)), late())
+        return upstream.calls, results
+
+    calls, (leader, joiner) = asyncio.run(scenario())
+    assert calls == 1
+    assert leader == joiner == [0, 1, 2, "done"]
+
+def test_stream_propagates_errors_after_the_events():
+    async def scenario():
+        flight = SingleFlight()
+        upstream = Upstream(error=ValueError("upstream failed"))
+        received = []
+
+        async def consume():
+            async for event in flight.stream("key", upstream.stream):
+                received.append(event)
+
+        results = await asyncio.gather(consume(), consume(), return_exceptions=True)
+        return upstream.calls, results, received
+
+    calls, results, received = asyncio.run(scenario())
+    assert calls == 1
+    assert [type(result) for result in results] == [ValueError, ValueError]
+    assert received == [0, 0, 1, 1, 2, 2]
+
+def test_stream_keeps_running_for_remaining_subscribers():
+    async def scenario():
+        flight = SingleFlight()
+        upstream = Upstream()
+        first = asyncio.ensure_future(collect(flight.stream("key", upstream.stream)))
+        second = asyncio.ensure_future(collect(flight.stream("key", upstream.stream)))
+        await asyncio.sleep(0.02)
+        first.cancel()
+        return await second, upstream.cancelled
+
+    events, cancelled = asyncio.run(scenario())
+    assert events == [0, 1, 2, "done"]
+    assert cancelled == 0
+
+def test_stream_cancels_upstream_when_abandoned():
+    async def scenario():
+        flight = SingleFlight()
+        upstream = Upstream()
+        events = flight.stream("key", upstream.stream)
+        assert await events.__anext__() == 0
+        await events.aclose()
+        await asyncio.sleep(0)
+        return upstream.cancelled, flight.get_stats()
+
+    cancelled, stats = asyncio.run(scenario())
+    assert cancelled == 1
+    assert stats["abandoned"] == 1 and stats["in_flight"] == 0
+
+def test_flights_are_separate_per_key():
+    async def scenario():
+        flight = SingleFlight()
+        upstream = Upstream()
+        await asyncio.gather(flight.run("a", upstream.call), flight.run("b", upstream.call))
+        return upstream.calls
+
+    assert asyncio.run(scenario()) == 2
+
+def test_errors_surface_when_awaiting_alone():
+    async def scenario():
+        flight = SingleFlight()
+        await flight.run("key", Upstream(error=KeyError("missing")).call)
+
+    with pytest.raises(KeyError):
+        asyncio.run(scenario())
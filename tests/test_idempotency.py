@@ -0,0 +1,161 @@
+import asyncio
+import json
+
+import pytest
+
+from backend.services.idempotency import IdempotencyCache, IdempotencyConflictError, fingerprint
+from backend.services.state import SQLiteStateStore
+
+class Counter:
+    def __init__(self, result=None, delay: float = 0.0, error: Exception = None):
+        self.calls = 0
+        self.result = result
+        self.delay = delay
+        self.error = error
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+def test_fingerprint_is_order_independent_for_mappings():
+    assert fingerprint({"a": 1, "b": 2}) == fingerprint({"b": 2, "a": 1})
+    assert fingerprint("subject", ["a@example.com"]) != fingerprint("subject", ["b@example.com"])
+
+def test_concurrent_runs_share_one_call():
+    async def scenario():
+        cache = IdempotencyCache()
+        factory = Counter({"job_id": "1"}, delay=0.02)
+        results = await asyncio.gather(*[cache.run(("send", "key"), "fp", factory) for _ in range(5)])
+        replay = await cache.run(("send", "key"), "fp", factory)
+        return factory.calls, results, replay
+
+    calls, results, replay = asyncio.run(scenario())
+    assert calls == 1
+    assert results == [{"job_id": "1"}] * 5
+    assert replay == {"job_id": "1"}
+
+def test_reused_key_with_different_request_conflicts():
+    async def scenario():
+        cache = IdempotencyCache()
+        await cache.run(("send", "key"), "fp", Counter("done"))
+        await cache.run(("send", "key"), "other", Counter("done"))
+
+    with pytest.raises(IdempotencyConflictError):
+        asyncio.run(scenario())
+
+def test_failures_and_rejected_results_are_not_cached():
+    async def scenario():
+        cache = IdempotencyCache()
+        with pytest.raises(RuntimeError):
+            await cache.run(("chat", "key"), "fp", Counter(error=RuntimeError("boom")))
+        rejected = Counter({"success": False})
+        await cache.run(("chat", "key"), "fp", rejected, cache_if=lambda result: result["success"])
+        accepted = Counter({"success": True})
+        await cache.run(("chat", "key"), "fp", accepted, cache_if=lambda result: result["success"])
+        await cache.run(("chat", "key"), "fp", accepted, cache_if=lambda result: result["success"])
+        return rejected.calls, accepted.calls
+
+    assert asyncio.run(scenario()) == (1, 1)
+
+def test_shared_store_replays_across_caches(tmp_path):
+    async def scenario():
+        store = SQLiteStateStore(str(tmp_path / "state.db"))
+        first = IdempotencyCache(store=store)
+        second = IdempotencyCache(store=store)
+        leader = Counter({"job_id": "1"}, delay=0.1)
+        follower = Counter({"job_id": "2"})
+        results = await asyncio.gather(
+            first.run(("send", "key"), "fp", leader),
+            second.run(("send", "key"), "fp", follower)
+        )
+        stored = json.loads(await store.get(first.store_key(("send", "key"))))
+        await store.aclose()
+        return leader.calls, follower.calls, results, stored
+
+    leader_calls, follower_calls, results, stored = asyncio.run(scenario())
+    assert (leader_calls, follower_calls) == (1, 0)
+    assert results == [{"job_id": "1"}, {"job_id": "1"}]
+    assert stored == {"fingerprint": "fp", "result": {"job_id": "1"}}
+
+def test_shared_store_conflicts_and_times_out(tmp_path):
+    async def scenario():
+        store = SQLiteStateStore(str(tmp_path / "state.db"))
+        cache = IdempotencyCache(store=store, wait_seconds=0.1)
+        await store.set(cache.store_key(("send", "key")), json.dumps({"fingerprint": "fp"}))
+        outcomes = []
+        for request_fingerprint in ("other", "fp"):
+            try:
+                await cache.run(("send", "key"), request_fingerprint, Counter("done"))
+            except IdempotencyConflictError as e:
+                outcomes.append(str(e))
+        await store.aclose()
+        return outcomes
+
+    conflict, timeout = asyncio.run(scenario())
+    assert "different request" in conflict
+    assert "still being processed" in timeout
+
+def test_shared_store_releases_key_after_failure(tmp_path):
+    async def scenario():
+        store = SQLiteStateStore(str(tmp_path / "state.db"))
+        cache = IdempotencyCache(store=store)
+        with pytest.raises(RuntimeError):
+            await cache.run(("send", "key"), "fp", Counter(error=RuntimeError("boom")))
+        released = await store.get(cache.store_key(("send", "key")))
+        retry = await IdempotencyCache(store=store).run(("send", "key"), "fp", Counter("done"))
+        await store.aclose()
+        return released, retry
+
+    assert asyncio.run(scenario()) == (None, "done")
+
+def test_claim_and_resolve_settle_joiners():
+    async def scenario():
+        cache = IdempotencyCache()
+        assert await cache.claim(("chat", "key"), "fp") is None
+        joiner = await cache.claim(("chat", "key"), "fp")
+        with pytest.raises(IdempotencyConflictError):
+            await cache.claim(("chat", "key"), "other")
+        await cache.resolve(("chat", "key"), {"success": True})
+        replay = await cache.claim(("chat", "key"), "fp")
+        return await joiner, await replay
+
+    assert asyncio.run(scenario()) == ({"success": True}, {"success": True})
+
+def test_resolve_with_error_fails_joiners_without_caching(tmp_path):
+    async def scenario():
+        store = SQLiteStateStore(str(tmp_path / "state.db"))
+        cache = IdempotencyCache(store=store)
+        assert await cache.claim(("chat", "key"), "fp") is None
+        joiner = await cache.claim(("chat", "key"), "fp")
+        await cache.resolve(("chat", "key"), None, RuntimeError("Stream was interrupted"))
+        with pytest.raises(RuntimeError):
+            await joiner
+        stored = await store.get(cache.store_key(("chat", "key")))
+        retry = await cache.claim(("chat", "key"), "fp")
+        await store.aclose()
+        return stored, retry
+
+    assert asyncio.run(scenario()) == (None, None)
+
+def test_claim_joins_a_result_published_by_another_cache(tmp_path):
+    async def scenario():
+        store = SQLiteStateStore(str(tmp_path / "state.db"))
+        first = IdempotencyCache(store=store)
+        second = IdempotencyCache(store=store)
+        assert await first.claim(("chat", "key"), "fp") is None
+
+        async def finish_later():
+            await asyncio.sleep(0.1)
+            await first.resolve(("chat", "key"), {"success": True})
+
+        finisher = asyncio.ensure_future(finish_later())
+        joined = await second.claim(("chat", "key"), "fp")
+        result = await joined
+        await finisher
+        await store.aclose()
+        return result
+
+    assert asyncio.run(scenario()) == {"success": True}
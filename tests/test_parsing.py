@@ -0,0 +1,51 @@
+import json
+
+from backend.services.parsing import PartialEmailParser, parse_email_json
+
+DRAFT = {"subject": "Team \"Offsite\"", "body": "Hi all,\n\nSee you at the café.\tThanks"}
+
+def feed_in_chunks(text: str, size: int):
+    parser = PartialEmailParser()
+    deltas = []
+    for start in range(0, len(text), size):
+        deltas.extend(parser.feed(text[start:start + size]))
+    return parser, deltas
+
+def test_partial_parser_matches_json_for_any_chunking():
+    text = json.dumps(DRAFT)
+    for size in (1, 2, 3, 5, 7, len(text)):
+        parser, deltas = feed_in_chunks(text, size)
+        assert parser.values == DRAFT
+        assert "".join(delta for field, delta in deltas if field == "body") == DRAFT["body"]
+
+def test_partial_parser_decodes_escapes_split_across_chunks():
+    parser = PartialEmailParser()
+    assert parser.feed('{"body": "caf\\u00') == [("body", "caf")]
+    assert parser.feed('e9 line\\') == [("body", "é line")]
+    assert parser.feed('nnext"}') == [("body", "\nnext")]
+    assert parser.values["body"] == "café line\nnext"
+
+def test_partial_parser_ignores_other_keys_and_streams_open_values():
+    parser = PartialEmailParser()
+    deltas = parser.feed('{"tone": "warm", "subject": "Hello", "body": "Dear te')
+    assert deltas == [("subject", "Hello"), ("body", "Dear te")]
+    assert parser.feed("am") == [("body", "am")]
+
+def test_parse_email_json_accepts_clean_json():
+    assert parse_email_json(json.dumps(DRAFT)) == (DRAFT, "ok")
+
+def test_parse_email_json_repairs_wrapped_and_truncated_output():
+    wrapped = "Here is your email:\n```json\n" + json.dumps(DRAFT) + "\n```"
+    assert parse_email_json(wrapped) == (DRAFT, "repaired")
+
+    truncated = '{"subject": "Update", "body": "Hi all,\\nThe launch is'
+    assert parse_email_json(truncated) == ({"subject": "Update", "body": "Hi all,\nThe launch is"}, "repaired")
+
+    untitled = '{"body": "Just the body"'
+    assert parse_email_json(untitled) == ({"subject": "Company Communication", "body": "Just the body"}, "repaired")
+
+def test_parse_email_json_falls_back_on_unusable_output():
+    assert parse_email_json(None) == ({"subject": "", "body": ""}, "failed")
+    assert parse_email_json("   ") == ({"subject": "", "body": ""}, "failed")
+    assert parse_email_json("Plain prose reply") == ({"subject": "Company Communication", "body": "Plain prose reply"}, "failed")
+    assert parse_email_json('{"subject": "Empty", "body": ""}')[1] == "failed"
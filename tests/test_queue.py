@@ -0,0 +1,127 @@
+import asyncio
+import time
+
+from backend.services.queue import SendQueue
+
+class FakeEmailService:
+    batch_size = 10
+    max_concurrency = 1
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.delivered = []
+
+    async def stream_campaign(self, employee_emails, subject, content, batched=True):
+        for email in employee_emails:
+            await asyncio.sleep(self.delay)
+            self.delivered.append(email)
+            yield {email: {"success": True, "attempts": 1, "status_code": 202}}
+
+def claim_row(queue: SendQueue, job_id: str):
+    return tuple(queue.connection.execute("SELECT claimed_by, claimed_at FROM send_jobs WHERE id = ?", (job_id,)).fetchone())
+
+async def wait_for_status(queue: SendQueue, job_id: str, status: str, timeout: float = 5.0) -> dict:
+    deadline = time.monotonic() + timeout
+    while True:
+        job = await queue.get_job(job_id)
+        if job["status"] == status or time.monotonic() > deadline:
+            return job
+        await asyncio.sleep(0.01)
+
+def test_insert_does_not_claim(tmp_path):
+    queue = SendQueue(FakeEmailService(), db_path=str(tmp_path / "queue.db"), workers=1)
+    queue.insert_job("job", ["a@example.com"], "Subject", "Body")
+    assert claim_row(queue, "job") == (None, None)
+    assert queue.unfinished_job_ids() == ["job"]
+
+def test_job_completes_and_reports_once(tmp_path):
+    async def scenario():
+        completed = []
+
+        async def on_complete(job):
+            completed.append(job["job_id"])
+
+        service = FakeEmailService()
+        queue = SendQueue(service, on_complete=on_complete, db_path=str(tmp_path / "queue.db"), workers=1)
+        job = await queue.enqueue(["a@example.com", "A@example.com", "b@example.com"], "Subject", "Body")
+        finished = await wait_for_status(queue, job["job_id"], "completed")
+        await queue.stop()
+        return service, finished, completed
+
+    service, job, completed = asyncio.run(scenario())
+    assert service.delivered == ["a@example.com", "b@example.com"]
+    assert (job["total_count"], job["sent_count"], job["queued_count"]) == (2, 2, 0)
+    assert completed == [job["job_id"]]
+
+def test_stop_keeps_progress_and_releases_claims(tmp_path):
+    db_path = str(tmp_path / "queue.db")
+    recipients = [f"user{index}@example.com" for index in range(20)]
+
+    async def interrupted():
+        service = FakeEmailService(delay=0.02)
+        queue = SendQueue(service, db_path=db_path, workers=1)
+        job = await queue.enqueue(recipients, "Subject", "Body")
+        while len(service.delivered) < 3:
+            await asyncio.sleep(0.005)
+        await queue.stop()
+        return service, queue, job["job_id"]
+
+    async def resumed():
+        service = FakeEmailService()
+        queue = SendQueue(service, db_path=db_path, workers=1)
+        started = time.monotonic()
+        await queue.start()
+        job = await wait_for_status(queue, job_id, "completed")
+        elapsed = time.monotonic() - started
+        await queue.stop()
+        return service, job, elapsed
+
+    first, queue, job_id = asyncio.run(interrupted())
+    partial = queue.load_job(job_id)
+    assert partial["status"] == "running"
+    assert partial["sent_count"] == len(first.delivered)
+    assert claim_row(queue, job_id) == (None, None)
+
+    second, job, elapsed = asyncio.run(resumed())
+    assert elapsed < queue.lease_seconds
+    assert job["sent_count"] == len(recipients)
+    assert sorted(first.delivered + second.delivered) == sorted(recipients)
+
+def test_claim_respects_lease(tmp_path):
+    db_path = str(tmp_path / "queue.db")
+    owner = SendQueue(FakeEmailService(), db_path=db_path, workers=1)
+    other = SendQueue(FakeEmailService(), db_path=db_path, workers=1)
+    owner.insert_job("job", ["a@example.com"], "Subject", "Body")
+
+    assert owner.claim_job("job")
+    assert owner.claim_job("job")
+    assert not other.claim_job("job")
+    assert other.unfinished_job_ids() == []
+
+    owner.connection.execute("UPDATE send_jobs SET claimed_at = ? WHERE id = 'job'", (time.time() - owner.lease_seconds - 1,))
+    owner.connection.commit()
+    assert other.unfinished_job_ids() == ["job"]
+    assert other.claim_job("job")
+    assert not owner.claim_job("job")
+
+def test_reclaim_resumes_expired_lease(tmp_path, monkeypatch):
+    monkeypatch.setenv("SEND_QUEUE_LEASE_SECONDS", "2")
+    db_path = str(tmp_path / "queue.db")
+
+    async def scenario():
+        crashed = SendQueue(FakeEmailService(), db_path=db_path, workers=1)
+        crashed.insert_job("job", ["a@example.com", "b@example.com"], "Subject", "Body")
+        crashed.claim_job("job")
+
+        service = FakeEmailService()
+        queue = SendQueue(service, db_path=db_path, workers=1)
+        await queue.start()
+        await asyncio.sleep(0.2)
+        assert service.delivered == []
+        job = await wait_for_status(queue, "job", "completed", timeout=10.0)
+        await queue.stop()
+        return service, job
+
+    service, job = asyncio.run(scenario())
+    assert service.delivered == ["a@example.com", "b@example.com"]
+    assert job["sent_count"] == 2
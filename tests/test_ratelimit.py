@@ -0,0 +1,72 @@
+import asyncio
+import time
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+
+from backend.services.ratelimit import AdaptiveRateLimiter, parse_retry_after
+
+def test_throttle_halves_rate_down_to_floor():
+    limiter = AdaptiveRateLimiter(rate=100)
+    rates = []
+    for _ in range(8):
+        limiter.throttle()
+        rates.append(limiter.rate)
+    assert rates[:3] == [50, 25, 12.5]
+    assert min(rates) == limiter.min_rate == 5.0
+    assert limiter.tokens <= 0
+
+def test_recover_increases_rate_additively_up_to_max():
+    limiter = AdaptiveRateLimiter(rate=100)
+    limiter.throttle()
+    limiter.recover()
+    assert limiter.rate == 55
+    for _ in range(20):
+        limiter.recover()
+    assert limiter.rate == limiter.max_rate
+
+def test_retry_after_blocks_acquire():
+    async def scenario():
+        limiter = AdaptiveRateLimiter(rate=1000, burst=10)
+        limiter.throttle(retry_after=0.1)
+        started = time.monotonic()
+        await limiter.acquire()
+        return time.monotonic() - started
+
+    assert asyncio.run(scenario()) >= 0.09
+
+def test_throttled_limiter_paces_acquires():
+    async def scenario():
+        limiter = AdaptiveRateLimiter(rate=40, burst=1)
+        limiter.throttle()
+        started = time.monotonic()
+        for _ in range(3):
+            await limiter.acquire()
+        return time.monotonic() - started
+
+    assert asyncio.run(scenario()) >= 0.12
+
+def test_disabled_limiter_is_a_no_op():
+    async def scenario():
+        limiter = AdaptiveRateLimiter(rate=0)
+        limiter.throttle(retry_after=60)
+        limiter.recover()
+        await asyncio.wait_for(limiter.acquire(), timeout=1)
+        return limiter
+
+    limiter = asyncio.run(scenario())
+    assert not limiter.enabled
+    assert (limiter.rate, limiter.blocked_until) == (0, 0.0)
+
+def test_parse_retry_after_seconds_and_dates():
+    assert parse_retry_after({"Retry-After": "3"}) == 3.0
+    assert parse_retry_after({"retry-after": "1.5"}) == 1.5
+    assert parse_retry_after({"Retry-After": "-4"}) == 0.0
+    retry_at = datetime.now(timezone.utc) + timedelta(seconds=30)
+    assert 25 <= parse_retry_after({"Retry-After": format_datetime(retry_at, usegmt=True)}) <= 30
+    past = datetime.now(timezone.utc) - timedelta(minutes=5)
+    assert parse_retry_after({"Retry-After": format_datetime(past, usegmt=True)}) == 0.0
+
+def test_parse_retry_after_ignores_missing_and_invalid_values():
+    assert parse_retry_after({}) is None
+    assert parse_retry_after({"Retry-After": ""}) is None
+    assert parse_retry_after({"Retry-After": "soon"}) is None